@@ -1,60 +1,325 @@
 # browser_api.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
+from waitress import serve
+import orjson
 import random
 import gemini_integration
+from core_cache import (
+    ExactCache, SingleFlight, cache_key, create_backend, screenshot_digest
+)
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
+import queue
+import atexit
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that batches writes through a 64KB buffer.
+
+    Records are only flushed immediately at ERROR and above; everything else
+    is flushed by a background flusher thread. The file size used for rollover is
+    tracked in memory and re-synced with os.stat at most once per second.
+    """
+
+    def __init__(self, *args, flush_interval=5.0, **kwargs):
+        self.flush_interval = flush_interval
+        self._size_estimate = 0
+        self._size_checked_at = 0.0
+        # Not _closed: logging.Handler.__init__ uses that name for its own flag
+        self._stop_flushing = threading.Event()
+        super().__init__(*args, **kwargs)
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name='log-flusher', daemon=True
+        )
+        self._flusher.start()
+
+    def _open(self):
+        """Open the log file behind a large write buffer."""
+        raw = io.FileIO(self.baseFilename, 'a')
+        return io.TextIOWrapper(
+            io.BufferedWriter(raw, buffer_size=65536),
+            encoding=self.encoding,
+            errors=self.errors,
+            write_through=False
+        )
+
+    def _flush_periodically(self):
+        """Flush buffered records every flush_interval seconds until closed."""
+        while not self._stop_flushing.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass  # A failed flush must not kill the flusher; the next one retries
+
+    def _would_rollover(self, length):
+        """Check whether writing length more bytes would exceed maxBytes."""
+        if self.maxBytes <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._size_checked_at >= 1.0:
+            try:
+                self._size_estimate = os.stat(self.baseFilename).st_size + self._buffered_bytes()
+            except OSError:
+                self._size_estimate = self._buffered_bytes()
+            self._size_checked_at = now
+        return self._size_estimate + length >= self.maxBytes
+
+    def _buffered_bytes(self):
+        """Bytes written to the stream but still held in its buffer (not yet on disk)."""
+        if self.stream is None:
+            return 0
+        buffer = self.stream.buffer
+        # The buffer writes out on its own when full, so ask it rather than counting
+        return buffer.tell() - buffer.raw.tell()
+
+    def shouldRollover(self, record):
+        """Determine if rollover should occur without seeking the stream."""
+        return self._would_rollover(len(self.format(record)) + len(self.terminator))
+
+    def doRollover(self):
+        """Rotate the files and reset the size bookkeeping."""
+        super().doRollover()
+        self._size_estimate = 0
+        self._size_checked_at = time.monotonic()
+
+    def emit(self, record):
+        """Write a record to the buffer, flushing only on errors."""
+        try:
+            msg = self.format(record) + self.terminator
+            if self._would_rollover(len(msg)):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._size_estimate += len(msg)
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        """Stop the flusher thread and close the file."""
+        self._stop_flushing.set()
+        super().close()
 
 # Set up file handler with rotation
-file_handler = RotatingFileHandler(
+file_handler = BufferedRotatingFileHandler(
     'browser_api.log',
     maxBytes=5*1024*1024,  # 5MB
     backupCount=3,
     delay=True  # Don't open the file until first write
 )
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 
-# Get the root logger and add the file handler
+# Hand records to a background listener so console output, file writes and
+# rotation happen off the request threads. The listener also takes over any
+# handlers already installed on the root logger (gemini_integration configures
+# logging when it is imported).
 root_logger = logging.getLogger()
-root_logger.addHandler(file_handler)
+root_logger.setLevel(logging.INFO)
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = root_logger.handlers[:] or [logging.StreamHandler()]
+log_handlers.append(file_handler)
+for handler in log_handlers:
+    root_logger.removeHandler(handler)
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+root_logger.addHandler(QueueHandler(log_queue))
 
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (keys are never sorted)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+def get_request_json():
+    """Parse the request body with orjson, returning None if it is empty or invalid."""
+    body = request.get_data(cache=False)
+    if not body:
+        return None
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        logger.warning("Received invalid JSON body")
+        return None
+
+# Pool of Gemini clients, created on first use in each worker process so no
+# client (or its gRPC channel) is built at import time or shared across a fork
+GEMINI_POOL_SIZE = int(os.getenv('GEMINI_POOL_SIZE', '4'))
+gemini_clients = queue.Queue()
+gemini_clients_created = 0
+gemini_clients_lock = threading.Lock()
 
-# Initialize Gemini integration
-gemini = gemini_integration.GeminiIntegration()
+@contextmanager
+def gemini_client():
+    """Borrow a Gemini client from the pool for the duration of a request."""
+    global gemini_clients_created
+    try:
+        client = gemini_clients.get_nowait()
+    except queue.Empty:
+        with gemini_clients_lock:
+            create = gemini_clients_created < GEMINI_POOL_SIZE
+            if create:
+                gemini_clients_created += 1
+        if create:
+            try:
+                client = gemini_integration.GeminiIntegration()
+            except Exception:
+                with gemini_clients_lock:
+                    gemini_clients_created -= 1
+                raise
+            logger.info("Created Gemini client %s of %s", gemini_clients_created, GEMINI_POOL_SIZE)
+        else:
+            client = gemini_clients.get()  # Pool is full; wait for a client to be returned
+    try:
+        yield client
+    finally:
+        gemini_clients.put(client)
+
+# Optional shared cache backend (e.g. redis://localhost:6379/0 or sqlite:///gemini_cache.db)
+cache_backend = create_backend(os.getenv('CACHE_BACKEND_URL'))
+
+# Exact-match cache for /execute_task actions
+exact_cache = ExactCache(max_entries=512, ttl=300, backend=cache_backend)
+
+# Raw screenshot bytes keyed by path, validated against (mtime_ns, size)
+MAX_CACHED_SCREENSHOTS = 64
+screenshot_cache = OrderedDict()
+screenshot_cache_lock = threading.Lock()
+
+def screenshot_bytes(path):
+    """Return the screenshot file contents, reusing the cached copy if the file is unchanged."""
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.warning("Screenshot not available: %s", e)
+        return None
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    with screenshot_cache_lock:
+        entry = screenshot_cache.get(path)
+        if entry is not None and entry[0] == stamp:
+            screenshot_cache.move_to_end(path)
+            return entry[1]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    with screenshot_cache_lock:
+        screenshot_cache[path] = (stamp, data)
+        screenshot_cache.move_to_end(path)
+        while len(screenshot_cache) > MAX_CACHED_SCREENSHOTS:
+            screenshot_cache.popitem(last=False)
+    return data
+
+# Shares one Gemini call between identical concurrent requests
+inflight_requests = SingleFlight()
+
+def generate_actions(task, screenshot_path, page_info):
+    """Generate actions for a task with a pooled Gemini client."""
+    with gemini_client() as gemini:
+        return gemini.generate_actions_with_gemini(
+            task, screenshot_bytes(screenshot_path), page_info
+        )
+
+def ndjson_lines(actions):
+    """Encode actions as newline-delimited JSON."""
+    for action in actions:
+        yield orjson.dumps(action) + b"\n"
+
+def stream_actions(task, screenshot_path, page_info, exact_key):
+    """Yield actions as Gemini produces them and cache the complete list."""
+    actions = []
+    try:
+        # closing() makes an abandoned stream clean up before the client is returned
+        with gemini_client() as gemini, closing(gemini.generate_actions_stream(
+            task, screenshot_bytes(screenshot_path), page_info
+        )) as stream:
+            for action in stream:
+                actions.append(action)
+                yield action
+    except Exception as e:
+        logger.exception("Error streaming actions")
+        yield {"error": f"Gemini streaming error: {str(e)}"}
+        return
+    if not actions:
+        yield {"error": "Failed to generate actions"}
+        return
+    exact_cache.put(exact_key, actions)
 
 @app.route('/execute_task', methods=['POST'])
 def execute_task():
     """Execute a task using Gemini."""
     try:
-        data = request.get_json()
+        data = get_request_json()
         if not data:
             return jsonify({"error": "No data provided"}), 400
             
-        task = data.get("task")
-        screenshot_path = data.get("screenshot_path")
-        page_info = data.get("page_info")
+        get = data.get
+        task = get("task")
+        screenshot_path = get("screenshot_path")
+        page_info = get("page_info")
+        stream = bool(get("stream"))
         
-        if not all([task, screenshot_path, page_info]):
+        if not task or not screenshot_path or not page_info:
             return jsonify({"error": "Missing required fields"}), 400
             
-        logger.info("\n=== New Task Execution Request ===")
-        logger.info(f"Task: {task}")
-        logger.info(f"URL: {page_info.get('url')}")
-        logger.info(f"Title: {page_info.get('title')}")
-        logger.info(f"Screenshot: {screenshot_path}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n=== New Task Execution Request ===")
+            logger.info("Task: %s", task)
+            logger.info("URL: %s", page_info.get('url'))
+            logger.info("Title: %s", page_info.get('title'))
+            logger.info("Screenshot: %s", screenshot_path)
+        
+        # Only exact matches (same task, page and screenshot) are replayed
+        exact_key = cache_key(
+            gemini_integration.MODEL_NAME, task, page_info, screenshot_digest(screenshot_path)
+        )
+        cached_actions = exact_cache.get(exact_key)
+        if cached_actions is not None and stream:
+            return Response(ndjson_lines(cached_actions), mimetype='application/x-ndjson')
+        if cached_actions is not None:
+            return jsonify({
+                "actions": cached_actions,
+                "screenshot_path": screenshot_path,
+                "cached": True
+            })
+        
+        # Stream actions back as ndjson as soon as Gemini produces them
+        if stream:
+            return Response(
+                stream_with_context(ndjson_lines(stream_actions(
+                    task, screenshot_path, page_info, exact_key
+                ))),
+                mimetype='application/x-ndjson'
+            )
         
-        # Generate actions using Gemini
-        actions = gemini.generate_actions_with_gemini(task, screenshot_path, page_info)
+        # Generate actions using Gemini (identical concurrent requests share one call)
+        actions = inflight_requests.do(
+            exact_key,
+            lambda: generate_actions(task, screenshot_path, page_info),
+            timeout=120
+        )
         
         if not actions:
             return jsonify({"error": "Failed to generate actions"}), 500
@@ -64,6 +329,8 @@ def execute_task():
             "actions": actions.get("actions", []),
             "screenshot_path": screenshot_path
         }
+        if response["actions"]:
+            exact_cache.put(exact_key, response["actions"])
             
         return jsonify(response)
         
@@ -73,9 +340,10 @@ def execute_task():
 
 @app.route('/user_confirmation', methods=['POST'])
 def user_confirmation():
-    confirmation_id = request.json.get('confirmation_id')
-    user_response = request.json.get('user_response')
-    logger.info(f"Received user confirmation: ID={confirmation_id}, Response={user_response}")
+    data = get_request_json() or {}
+    confirmation_id = data.get('confirmation_id')
+    user_response = data.get('user_response')
+    logger.info("Received user confirmation: ID=%s, Response=%s", confirmation_id, user_response)
     return jsonify({"status": "confirmation_received"}) # Placeholder response
 
 
@@ -88,7 +356,7 @@ def get_current_page_state():
 def process_request():
     """Process a request using Gemini."""
     try:
-        data = request.get_json()
+        data = get_request_json()
         if not data:
             return jsonify({"error": "No data provided"}), 400
             
@@ -96,12 +364,15 @@ def process_request():
         if not message:
             return jsonify({"error": "No message provided"}), 400
             
-        logger.info("\n=== New Process Request ===")
-        logger.info(f"Message: {message}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n=== New Process Request ===")
+            logger.info("Message: %s", message)
         
-        # Process with Gemini
+        # Process with Gemini (never cached: the reply depends on the pooled
+        # client's conversation so far, and may be an error message)
         try:
-            response = gemini.process_message(message)
+            with gemini_client() as gemini:
+                response = gemini.process_message(message)
             return jsonify({"message": response})
         except Exception as e:
             logger.exception("Error processing with Gemini")
@@ -112,6 +383,14 @@ def process_request():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Return hit/miss statistics for the response caches."""
+    return jsonify({
+        "exact": exact_cache.stats()
+    })
+
+
 @app.route('/')
 def root():
     """Health check endpoint."""
@@ -120,4 +399,5 @@ def root():
 
 if __name__ == '__main__':
     logger.info("\n=== Starting Browser API Server ===")
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Multi-threaded WSGI server so concurrent Gemini calls overlap
+    serve(app, host='127.0.0.1', port=5000, threads=8)
\ No newline at end of file
@@ -2,23 +2,29 @@
 import os
 import sys
 import logging
-import traceback
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 import json
-from datetime import datetime
+import hashlib
+import orjson
+from collections import deque
 import codecs
-import uuid
-from PyQt6.QtCore import Qt, QUrl, QTimer
-from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage, QWebEngineScript
+import re
+import textwrap
+from PyQt6.QtCore import (
+    Qt, QUrl, QTimer, QObject, QRunnable, QThreadPool, QBuffer, QIODevice, QFile,
+    pyqtSignal, pyqtSlot
+)
+from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage, QWebEngineScript, QWebEngineSettings
 from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWebChannel import QWebChannel
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QTextEdit, QLabel, QSplitter
+    QPushButton, QLineEdit, QPlainTextEdit, QLabel, QStackedWidget
 )
-from PyQt6.QtGui import QPixmap, QTextCursor
+from PyQt6.QtGui import QTextCursor, QImage, QPainter
 from gemini_integration import GeminiIntegration
-import requests
-import glob
-import tempfile
 import time
 
 # Configure logging with proper encoding for Windows console
@@ -26,28 +32,646 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('browser.log'),
-        logging.StreamHandler()
-    ]
-)
+# Hand records to a background listener so file and console writes happen off
+# the GUI thread. The listener also takes over any handlers already installed on
+# the root logger (gemini_integration configures logging when it is imported).
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = root_logger.handlers[:] or [logging.StreamHandler()]
+log_handlers.append(logging.FileHandler('browser.log'))
+for handler in log_handlers:
+    root_logger.removeHandler(handler)
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+root_logger.addHandler(QueueHandler(log_queue))
+
 logger = logging.getLogger(__name__)
 
+# Number of screenshots kept on disk, and where they are written
+MAX_SCREENSHOTS = 10
+SCREENSHOT_DIR = 'screenshots'
+
+# Save a PNG of every loaded page to screenshots/ for debugging; the chat sends
+# its screenshots to Gemini from memory either way
+SAVE_SCREENSHOTS = os.getenv('SAVE_SCREENSHOTS', '0') == '1'
+
+# PNG "quality" maps to zlib level in Qt (100 = no compression); 80 is a fast,
+# light compression instead of the slow default level
+SCREENSHOT_PNG_QUALITY = 80
+
+# Chat screenshots are sent as downscaled in-memory JPEGs that fit in a single
+# 768x768 Gemini image tile
+SCREENSHOT_MAX_SIZE = 768
+SCREENSHOT_JPEG_QUALITY = 75
+
+# Shared decoder for actions embedded in Gemini responses
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE_RE = re.compile(r'\s*')
+
+_JS_TRAILING_COMMENT_RE = re.compile(r"\s+//[^'\"`\n]*$")
+
+# URL prefixes accepted as-is by navigate_to_url (schemes are case-insensitive)
+_URL_SCHEME_RE = re.compile(r'https?://', re.IGNORECASE)
+
+# Browser profile shared by every page: disk HTTP cache and cookies survive restarts.
+# It lives in Qt's per-user data/cache locations for this application name
+APP_NAME = 'gemini-browser'
+PROFILE_NAME = 'gemini-browser'
+PROFILE_CACHE_SIZE = 256 * 1024 * 1024
+
+# With PRIVATE_PROFILE=1 an off-the-record profile is used instead: memory-only
+# HTTP cache and cookies, nothing written to disk while browsing
+PRIVATE_PROFILE = os.getenv('PRIVATE_PROFILE', '0') == '1'
+PRIVATE_PROFILE_CACHE_SIZE = 64 * 1024 * 1024
+
+# Number of extracted items shown in the chat
+EXTRACT_PREVIEW_ITEMS = 20
+
+# Fallback before the queue moves on if a page action never reports its result.
+# Results arrive once the helpers have finished, so the fallback for an action or
+# batch is this margin plus the timeouts of every wait in it
+ACTION_RESULT_TIMEOUT_MS = 5000
+
+# Seconds a wait action looks for its element when Gemini gives no timeout
+DEFAULT_WAIT_TIMEOUT = 10
+
+# Delay after loadFinished before the next queued action, to let the DOM settle
+PAGE_SETTLE_MS = 50
+
+# Cheap page fingerprint used to skip screenshots of unchanged documents
+_DOM_FINGERPRINT_JS = "document.documentElement.innerHTML.length + ':' + document.title"
+
+def _ensure_scheme(url):
+    """Prefix https:// to a URL that has no http(s) scheme."""
+    return url if _URL_SCHEME_RE.match(url) else 'https://' + url
+
+def _minify_js(source):
+    """Strip comments, indentation and blank lines from an embedded JS snippet."""
+    lines = []
+    for line in textwrap.dedent(source).splitlines():
+        line = _JS_TRAILING_COMMENT_RE.sub('', line).strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+# Search-box helper, installed once per page as window.__agentSearch(value)
+_AGENT_SEARCH_JS = _minify_js("""
+window.__agentSearch = async function(value) {
+    try {
+        // Elements resolved earlier on this document, reused while still visible
+        const targets = window.__agentTargets || (window.__agentTargets = new Map());
+
+        // Cheapest checks first; offsetParent is null for display:none subtrees, so
+        // getComputedStyle is only needed for visibility:hidden on laid-out elements
+        function isVisible(el) {
+            if (!el.isConnected || el.offsetParent === null) return false;
+            const rect = el.getClientRects()[0];
+            if (!rect || rect.width <= 0 || rect.height <= 0) return false;
+            return window.getComputedStyle(el).visibility !== 'hidden';
+        }
+
+        // Enhanced element finder with more selectors
+        function findSearchInput() {
+            // Common search input selectors
+            const searchSelectors = [
+                // Standard search inputs
+                'input[type="search"]',
+                'input[type="text"]',
+                'input[name="q"]',
+                'input[name="query"]',
+                'input[name="search"]',
+                'input[name="symbol"]', // For trading platforms
+                'input[name="ticker"]', // For trading platforms
+
+                // Inputs with search-related attributes
+                'input[placeholder*="search" i]',
+                'input[placeholder*="symbol" i]',
+                'input[placeholder*="ticker" i]',
+                'input[aria-label*="search" i]',
+                'input[title*="search" i]',
+
+                // Trading platform specific
+                '.tv-search-row__input input',  // TradingView
+                '.js-search-input',             // Common class
+                '#symbol-search',               // Common ID
+
+                // Common e-commerce search
+                '#gh-ac',                       // eBay
+                '#twotabsearchtextbox',         // Amazon
+                'input[name="st"]',             // Common store search
+
+                // Fallbacks
+                'textarea[placeholder*="search" i]',
+                'input[role="searchbox"]',
+                'input[role="combobox"]',
+                '[contenteditable="true"]',
+                'input'
+            ];
+
+            // One traversal for all selectors; earlier selectors still take priority
+            let best = null;
+            let bestRank = searchSelectors.length;
+            for (const el of document.querySelectorAll(searchSelectors.join(','))) {
+                const rank = searchSelectors.findIndex(selector => el.matches(selector));
+                if (rank < bestRank && isVisible(el)) {
+                    best = el;
+                    bestRank = rank;
+                    if (rank === 0) break;
+                }
+            }
+            if (best) {
+                console.log('Found search input:', best);
+            }
+            return best;
+        }
+
+        // Find search input, reusing the one found by a previous search
+        let searchInput = targets.get('search');
+        if (!searchInput || !isVisible(searchInput)) {
+            searchInput = findSearchInput();
+            if (!searchInput) {
+                throw new Error('No search input found');
+            }
+            targets.set('search', searchInput);
+        }
+
+        // Focus and fill the input
+        searchInput.focus();
+        searchInput.value = value;
+        searchInput.dispatchEvent(new Event('input', { bubbles: true }));
+
+        // Try to find and click a search button
+        const searchButtonSelectors = [
+            'button[type="submit"]',
+            'input[type="submit"]',
+            'button[aria-label*="search" i]',
+            'button[title*="search" i]',
+            '.search-button',
+            '.searchButton',
+            '#search-button',
+            '[role="search"] button'
+        ];
+
+        let searchButton = null;
+        for (const selector of searchButtonSelectors) {
+            const button = document.querySelector(selector);
+            if (button) {
+                const style = window.getComputedStyle(button);
+                if (style.display !== 'none' && style.visibility !== 'hidden') {
+                    searchButton = button;
+                    break;
+                }
+            }
+        }
+
+        // Click the search button if found, otherwise submit the form
+        if (searchButton) {
+            searchButton.click();
+        } else {
+            const form = searchInput.closest('form');
+            if (form) {
+                form.submit();
+            } else {
+                searchInput.dispatchEvent(new KeyboardEvent('keydown', { key: 'Enter', code: 'Enter', keyCode: 13, bubbles: true }));
+            }
+        }
+
+        return {
+            success: true,
+            message: `Successfully filled search input with: ${value}`,
+            details: {
+                inputType: searchInput.type,
+                inputName: searchInput.name,
+                inputId: searchInput.id
+            }
+        };
+    } catch (error) {
+        console.error('Search error:', error);
+        return {
+            success: false,
+            error: error.toString(),
+            details: { message: error.message }
+        };
+    }
+};
+""")
+
+# Click-by-text helper, installed once per page as window.__agentClick(value)
+_AGENT_CLICK_JS = _minify_js("""
+window.__agentClick = async function(value) {
+    try {
+        // Platform-specific selectors for TradingView
+        const tradingViewSelectors = [
+            '.tv-symbol-price-quote__name',  // Symbol name
+            '.tv-category-header__title',    // Section headers
+            '.tv-symbol-header__text',       // Symbol header
+            '.tv-screener__symbol',          // Screener symbols
+            '.tv-chart-view__title',         // Chart title
+            '.tv-dialog__title',             // Dialog titles
+            '.tv-market-status__label',      // Market status
+            '.js-button-text',               // Button text
+            '.tv-control-input__input'       // Input controls
+        ];
+
+        // Common clickable elements
+        const commonSelectors = [
+            'a', 'button', 'input[type="submit"]', 'input[type="button"]',
+            '[role="button"]', '[tabindex]', '[role="link"]', '[role="tab"]',
+            '[role="menuitem"]'
+        ];
+
+        // Combine all selectors
+        const allSelectors = [...tradingViewSelectors, ...commonSelectors];
+
+        // Cheapest checks first; offsetParent is null for display:none subtrees, so
+        // getComputedStyle is only needed for visibility:hidden on laid-out elements
+        function isVisible(el) {
+            if (!el.isConnected || el.offsetParent === null) return false;
+            const rect = el.getClientRects()[0];
+            if (!rect || rect.width <= 0 || rect.height <= 0) return false;
+            return window.getComputedStyle(el).visibility !== 'hidden';
+        }
+
+        // Elements resolved earlier on this document, reused while still visible
+        const targets = window.__agentTargets || (window.__agentTargets = new Map());
+        const searchText = value.toLowerCase();
+        const targetKey = 'click:' + searchText;
+        let targetElement = targets.get(targetKey);
+        if (targetElement && !isVisible(targetElement)) {
+            targetElement = null;
+        }
+
+        // Find all potential elements
+        const elements = targetElement ? [] : Array.from(document.querySelectorAll(allSelectors.join(',')));
+
+        // Find visible element with matching text
+        for (const el of elements) {
+            // Check text content and attributes
+            const elementText = (
+                el.textContent?.trim() ||
+                el.value?.trim() ||
+                el.getAttribute('aria-label')?.trim() ||
+                el.getAttribute('title')?.trim() ||
+                el.getAttribute('alt')?.trim() ||
+                el.getAttribute('data-symbol')?.trim() || // For TradingView symbols
+                el.getAttribute('data-name')?.trim() ||   // For TradingView elements
+                ''
+            ).toLowerCase();
+
+            // Text is matched before visibility so layout is only read for candidates
+            if (elementText.includes(searchText) && isVisible(el)) {
+                targetElement = el;
+                targets.set(targetKey, el);
+                break;
+            }
+        }
+
+        if (!targetElement) {
+            throw new Error(`No clickable element found with text: ${value}`);
+        }
+
+        // Scroll element into view
+        targetElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        await new Promise(resolve => setTimeout(resolve, 500));
+
+        // Click the element
+        targetElement.focus();
+        targetElement.click();
+
+        // For TradingView, also try to trigger a custom event
+        if (window.TradingView) {
+            targetElement.dispatchEvent(new CustomEvent('tv-action'));
+        }
+
+        return { 
+            success: true, 
+            message: `Successfully clicked element with text: ${value}`,
+            details: {
+                tagName: targetElement.tagName,
+                className: targetElement.className,
+                id: targetElement.id
+            }
+        };
+    } catch (error) {
+        console.error('Click error:', error);
+        return { 
+            success: false, 
+            error: error.toString(),
+            details: { message: error.message }
+        };
+    }
+};
+""")
+
+# Form-fill helper, installed once per page as window.__agentFill(field, value)
+_AGENT_FILL_JS = _minify_js("""
+window.__agentFill = async function(fieldName, value) {
+    try {
+        // Find form field by placeholder or aria-label with one native selector query
+        const needle = CSS.escape(fieldName);
+        let field = document.querySelector([
+            `input[placeholder*="${needle}"]`,
+            `input[aria-label*="${needle}"]`,
+            `textarea[placeholder*="${needle}"]`,
+            `textarea[aria-label*="${needle}"]`
+        ].join(','));
+
+        // Fall back to the input or textarea that follows a matching label
+        if (!field) {
+            const label = Array.from(document.querySelectorAll('label'))
+                .find(l => l.textContent.includes(fieldName));
+            if (label) {
+                field = label.control || Array.from(document.querySelectorAll('input, textarea'))
+                    .find(el => label.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING);
+            }
+        }
+
+        if (!field) {
+            return { success: false, error: `Could not find field: ${fieldName}` };
+        }
+
+        // Focus and fill the field
+        field.focus();
+        field.value = value;
+        field.dispatchEvent(new Event('input', { bubbles: true }));
+        field.dispatchEvent(new Event('change', { bubbles: true }));
+
+        return { success: true };
+    } catch (error) {
+        console.error('Error:', error);
+        return { success: false, error: error.toString() };
+    }
+};
+""")
+
+_AGENT_SELECT_JS = _minify_js("""
+window.__agentSelect = async function(fieldName, value) {
+    try {
+        // Find select element by name or aria-label with one native selector query
+        const needle = CSS.escape(fieldName);
+        let select = document.querySelector(
+            `select[name*="${needle}"], select[aria-label*="${needle}"]`
+        );
+
+        // Fall back to the first select that follows a matching label
+        if (!select) {
+            const label = Array.from(document.querySelectorAll('label'))
+                .find(l => l.textContent.includes(fieldName));
+            if (label) {
+                select = Array.from(document.querySelectorAll('select'))
+                    .find(el => label.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING);
+            }
+        }
+
+        if (!select) {
+            return { success: false, error: `Could not find dropdown: ${fieldName}` };
+        }
+
+        // Find matching option with one case-insensitive regex, stopping at the first hit
+        const wanted = new RegExp(value.replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&'), 'i');
+        let option = null;
+        for (let i = 0; i < select.options.length; i++) {
+            const opt = select.options[i];
+            if (wanted.test(opt.text) || wanted.test(opt.value)) {
+                option = opt;
+                break;
+            }
+        }
+
+        if (!option) {
+            return { success: false, error: `Could not find option: ${value}` };
+        }
+
+        // Select the option
+        select.value = option.value;
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+
+        return { success: true };
+    } catch (error) {
+        console.error('Error:', error);
+        return { success: false, error: error.toString() };
+    }
+};
+""")
+
+_AGENT_HOVER_JS = _minify_js("""
+window.__agentHover = async function(selector) {
+    try {
+        const element = document.querySelector(selector);
+        if (!element) {
+            return { success: false, error: `Could not find element: ${selector}` };
+        }
+
+        // Trigger hover events
+        element.dispatchEvent(new MouseEvent('mouseover', { bubbles: true }));
+        element.dispatchEvent(new MouseEvent('mouseenter', { bubbles: true }));
+
+        return { success: true };
+    } catch (error) {
+        console.error('Error:', error);
+        return { success: false, error: error.toString() };
+    }
+};
+""")
+
+_AGENT_WAIT_JS = _minify_js("""
+window.__agentWait = async function(selector, timeout) {
+    try {
+        function waitForElement(selector, timeout) {
+            return new Promise((resolve, reject) => {
+                const element = document.querySelector(selector);
+                if (element) {
+                    resolve(element);
+                    return;
+                }
+
+                // React to DOM changes instead of polling; one timer covers the timeout
+                const observer = new MutationObserver(() => {
+                    const found = document.querySelector(selector);
+                    if (found) {
+                        observer.disconnect();
+                        clearTimeout(timer);
+                        resolve(found);
+                    }
+                });
+                const timer = setTimeout(() => {
+                    observer.disconnect();
+                    reject(new Error(`Timeout waiting for element: ${selector}`));
+                }, timeout * 1000);
+                observer.observe(document.documentElement, { childList: true, subtree: true, attributes: true });
+            });
+        }
+
+        await waitForElement(selector, timeout);
+        return { success: true };
+    } catch (error) {
+        console.error('Error:', error);
+        return { success: false, error: error.toString() };
+    }
+};
+""")
+
+_AGENT_EXTRACT_JS = _minify_js("""
+window.__agentExtract = async function(selector, attribute) {
+    try {
+        const elements = Array.from(document.querySelectorAll(selector));
+        if (elements.length === 0) {
+            return { success: false, error: `No elements found matching: ${selector}` };
+        }
+
+        const results = elements.map(el => {
+            if (attribute === 'textContent') {
+                return el.textContent.trim();
+            } else {
+                return el.getAttribute(attribute);
+            }
+        }).filter(Boolean);
+
+        return { success: true, data: results };
+    } catch (error) {
+        console.error('Error:', error);
+        return { success: false, error: error.toString() };
+    }
+};
+""")
+
+# Page actions that can be sent to the page together in one bridge call;
+# search and click may navigate away, so they can only end a batch
+_BATCHABLE_ACTIONS = frozenset({'fill', 'select', 'hover', 'wait', 'extract'})
+_BATCH_ENDING_ACTIONS = frozenset({'search', 'click'})
+
+_AGENT_BATCH_JS = _minify_js("""
+window.__agentBatch = async function(steps) {
+    // Run each [helper, args] step in order and collect the results
+    const results = [];
+    for (const [name, args] of steps) {
+        try {
+            results.push(await window['__agent' + name](...args));
+        } catch (error) {
+            results.push({ success: false, error: error.toString() });
+        }
+    }
+    return results;
+};
+""")
+
+# Connects to the AgentBridge over QWebChannel, runs the helpers it asks for and
+# reports each awaited result back; installed after qwebchannel.js
+_AGENT_BRIDGE_JS = _minify_js("""
+new QWebChannel(qt.webChannelTransport, function(channel) {
+    const bridge = channel.objects.agentBridge;
+    bridge.runAction.connect(async function(callId, name, args) {
+        let result;
+        try {
+            result = await window['__agent' + name](...args);
+        } catch (error) {
+            result = { success: false, error: error.toString() };
+        }
+        bridge.reportResult(callId, result);
+    });
+});
+""")
+
+# Resource path of the QWebChannel client library shipped with QtWebEngine
+_QWEBCHANNEL_JS_PATH = ':/qtwebchannel/qwebchannel.js'
+
+# Helpers registered as user scripts on every page: (name, source)
+_AGENT_SCRIPTS = (
+    ('agent-search', _AGENT_SEARCH_JS),
+    ('agent-click', _AGENT_CLICK_JS),
+    ('agent-fill', _AGENT_FILL_JS),
+    ('agent-select', _AGENT_SELECT_JS),
+    ('agent-hover', _AGENT_HOVER_JS),
+    ('agent-wait', _AGENT_WAIT_JS),
+    ('agent-extract', _AGENT_EXTRACT_JS),
+    ('agent-batch', _AGENT_BATCH_JS),
+)
+
+class ScreenshotSignals(QObject):
+    """Signals for background screenshot saves."""
+    finished = pyqtSignal(str, bool)  # path, success
+
+class ScreenshotSaveTask(QRunnable):
+    """Encode and write a grabbed screenshot on a worker thread."""
+    
+    def __init__(self, image, path):
+        super().__init__()
+        self.image = image  # Must not be painted on again while the task runs
+        self.path = path
+        self.signals = ScreenshotSignals()
+
+    def run(self):
+        """Save the image as PNG and report the result."""
+        ok = self.image.save(self.path, 'PNG', SCREENSHOT_PNG_QUALITY)
+        self.signals.finished.emit(self.path, ok)
+
+class GeminiSignals(QObject):
+    """Signals for background Gemini requests."""
+    finished = pyqtSignal(object, object)  # task, str or dict response
+
+class GeminiRequestTask(QRunnable):
+    """Run a blocking GeminiIntegration.process_request call on a worker thread."""
+    
+    def __init__(self, get_gemini, message, current_url, screenshot):
+        super().__init__()
+        self.get_gemini = get_gemini  # Resolved on the worker thread, where setup may block
+        self.message = message
+        self.current_url = current_url
+        self.screenshot = screenshot
+        self.signals = GeminiSignals()
+
+    def run(self):
+        """Send the request and report the response."""
+        try:
+            response = self.get_gemini().process_request(self.message, self.current_url, self.screenshot)
+        except Exception as e:
+            logger.exception(f"Error in Gemini request: {e}")
+            response = f"Error: {str(e)}"
+        self.signals.finished.emit(self, response)
+
+class AgentBridge(QObject):
+    """Object shared with the page over QWebChannel to run the agent helpers."""
+    runAction = pyqtSignal(int, str, 'QVariantList')  # call id, helper name, arguments
+    resultReady = pyqtSignal(int, object)  # call id, helper result
+
+    @pyqtSlot(int, 'QVariant')
+    def reportResult(self, call_id, result):
+        """Called from the page once a helper has finished."""
+        self.resultReady.emit(call_id, result)
+
 class CustomWebEnginePage(QWebEnginePage):
     """Custom web engine page with additional functionality."""
     
-    def __init__(self, parent=None):
-        super().__init__(QWebEngineProfile.defaultProfile(), parent)
+    consoleMessages = pyqtSignal(list)  # console messages batched since the last flush
+    alertRaised = pyqtSignal(str)  # JavaScript alert text
+    
+    def __init__(self, profile=None, parent=None):
+        super().__init__(profile or QWebEngineProfile.defaultProfile(), parent)
         self._parent = parent  # Store parent reference
+        
+        # Console messages are batched so chatty pages log ~10 times per second at most
+        self._console_messages = []
+        self._console_timer = QTimer(self)
+        self._console_timer.setSingleShot(True)
+        self._console_timer.setInterval(100)
+        self._console_timer.timeout.connect(self._flush_console_messages)
 
     def javaScriptConsoleMessage(self, level, message, line, source):
         """Handle JavaScript console messages."""
-        logger.info(f"JS Console: {message}")
-        if hasattr(self._parent, 'js_console_log'):
-            self._parent.js_console_log(message)
+        self._console_messages.append(message)
+        if not self._console_timer.isActive():
+            self._console_timer.start()
+
+    def _flush_console_messages(self):
+        """Emit the console messages collected since the last flush."""
+        messages, self._console_messages = self._console_messages, []
+        if messages:
+            self.consoleMessages.emit(messages)
 
     def certificateError(self, error):
         """Handle SSL certificate errors."""
@@ -58,8 +682,7 @@ class CustomWebEnginePage(QWebEnginePage):
         """Handle JavaScript alerts."""
         try:
             logger.info(f"JavaScript alert: {msg}")
-            if hasattr(self._parent, 'chat_history'):
-                self._parent.chat_history.append(f"Alert: {msg}")
+            self.alertRaised.emit(msg)
             return True
         except Exception as e:
             logger.error(f"Error handling JavaScript alert: {e}")
@@ -67,6 +690,7 @@ class CustomWebEnginePage(QWebEnginePage):
 
 class BrowserWindow(QMainWindow):
     """Main browser window."""
+    extraction_ready = pyqtSignal(str, list)  # selector, extracted items
     
     def __init__(self):
         super().__init__()
@@ -85,32 +709,32 @@ class BrowserWindow(QMainWindow):
             # Create navigation toolbar
             nav_toolbar = QHBoxLayout()
             
-            # Create browser view first
-            self.browser = QWebEngineView()
-            self.page = CustomWebEnginePage(self.browser)
-            self.browser.setPage(self.page)
-            
-            # Connect signals
-            self.browser.urlChanged.connect(self.update_url)
-            self.page.loadFinished.connect(self.handle_load_finished)
-            
-            # Set default homepage
+            # The web view is created once the window has been shown (see _init_browser);
+            # a placeholder keeps its place in the layout until then
+            self.browser = None
+            self.page = None
+            self.bridge = None
+            self._browser_stack = QStackedWidget()
+            self._browser_stack.addWidget(QLabel('Loading browser...', alignment=Qt.AlignmentFlag.AlignCenter))
             self.default_url = 'https://www.google.com'
-            self.browser.setUrl(QUrl(self.default_url))
+            
+            # URL bar updates are debounced; redirects fire urlChanged in bursts
+            self._pending_url = None
+            self._url_timer = QTimer(self)
+            self._url_timer.setSingleShot(True)
+            self._url_timer.setInterval(50)
+            self._url_timer.timeout.connect(self._flush_url)
             
             # Back button
             self.back_button = QPushButton('←')
-            self.back_button.clicked.connect(self.browser.back)
             nav_toolbar.addWidget(self.back_button)
             
             # Forward button
             self.forward_button = QPushButton('→')
-            self.forward_button.clicked.connect(self.browser.forward)
             nav_toolbar.addWidget(self.forward_button)
             
             # Refresh button
             self.refresh_button = QPushButton('↻')
-            self.refresh_button.clicked.connect(self.browser.reload)
             nav_toolbar.addWidget(self.refresh_button)
             
             # Home button
@@ -127,14 +751,26 @@ class BrowserWindow(QMainWindow):
             main_layout.addLayout(nav_toolbar)
             
             # Add browser to layout
-            main_layout.addWidget(self.browser, stretch=1)
+            main_layout.addWidget(self._browser_stack, stretch=1)
             
             # Create chat interface
             chat_layout = QHBoxLayout()
             
             # Chat history
-            self.chat_history = QTextEdit()
+            # Plain-text log with a bounded block count keeps appends cheap
+            self.chat_history = QPlainTextEdit()
             self.chat_history.setReadOnly(True)
+            self.chat_history.setMaximumBlockCount(1000)
+            self.chat_history.setUndoRedoEnabled(False)  # Don't keep an undo record per append
+            # Persistent end-of-document cursor used by _append_chat
+            self._chat_cursor = QTextCursor(self.chat_history.document())
+            self._chat_cursor.movePosition(QTextCursor.MoveOperation.End)
+            # Chat lines are buffered and written at most once per frame
+            self._chat_buffer = []
+            self._chat_flush_timer = QTimer(self)
+            self._chat_flush_timer.setSingleShot(True)
+            self._chat_flush_timer.setInterval(16)
+            self._chat_flush_timer.timeout.connect(self._flush_chat)
             chat_layout.addWidget(self.chat_history)
             
             # Chat input
@@ -158,47 +794,188 @@ class BrowserWindow(QMainWindow):
             central_widget.setLayout(main_layout)
             self.setCentralWidget(central_widget)
             
-            # Initialize Gemini integration
-            self.gemini = GeminiIntegration()
-            logger.info("Gemini integration initialized")
+            # Gemini integration is created on first use so the window paints first
+            self._gemini = None
             
             # Initialize action queue
-            self.action_queue = []
+            self.action_queue = deque()
             self.action_in_progress = False
             self.page_load_complete = True
+            self._queued_keys = set()  # _action_key() of every action waiting in the queue
+            self._action_seq = 0  # Identifies the action a JS result callback belongs to
+            self._awaiting_js_result = False
+            
+            # Result callbacks for helper calls sent over the web channel, by call id
+            self._bridge_call_id = 0
+            self._bridge_callbacks = {}
+            
+            # Fingerprint of the page at the last post-load screenshot
+            self._last_dom_fingerprint = None
+            
+            # Bumped on loads and dispatched actions; the chat screenshot is reused
+            # while (url, page version) stays the same
+            self._page_version = 0
+            self._last_shot_key = None
+            self._last_shot_bytes = None
+            self._view_image = None  # Render target reused by every screenshot
+            self._last_image_digest = None  # Hash of the last frame written to disk
+            self._last_image_path = None
+            
+            # Background screenshot saves, kept alive until they report back
+            self._pending_screenshot_saves = {}
+            
+            # Gemini requests run one at a time off the UI thread (the chat session is not thread-safe)
+            self._gemini_pool = QThreadPool(self)
+            self._gemini_pool.setMaxThreadCount(1)
+            self._pending_gemini_requests = set()
+            
+            # Recent screenshots, reconciled with the directory once at startup
+            if SAVE_SCREENSHOTS:
+                os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+            self._recent_screenshots = deque(self._cleanup_old_screenshots(), maxlen=MAX_SCREENSHOTS)
+            
+            # Heavy startup work runs after the first paint: Chromium starts with the
+            # web view, and Gemini is set up on the request thread in the meantime
+            QTimer.singleShot(0, self._init_browser)
+            self._gemini_pool.start(self._warm_up_gemini)
+            
+        except Exception as e:
+            logger.exception(f"Error in BrowserWindow.init_ui: {str(e)}")
+
+    def _init_browser(self):
+        """Create the web view, swap it in for the placeholder and load the homepage."""
+        try:
+            self.browser = QWebEngineView()
+            self.profile = self._create_profile()
+            self._configure_web_settings(self.profile.settings())
+            self.page = CustomWebEnginePage(self.profile, self.browser)
+            self.browser.setPage(self.page)
+            self.page.consoleMessages.connect(self.js_console_log)
+            self.page.alertRaised.connect(self._on_js_alert)
+            
+            # Actions are sent to the page helpers, and results come back, over a web channel
+            self.bridge = AgentBridge(self)
+            self.bridge.resultReady.connect(self._on_bridge_result)
+            self._web_channel = QWebChannel(self.page)
+            self._web_channel.registerObject('agentBridge', self.bridge)
+            self.page.setWebChannel(self._web_channel)
             
-            # Action timer
-            self.action_timer = QTimer()
-            self.action_timer.timeout.connect(self._process_action_queue)
+            # Install the action helpers so they are parsed once per page load
+            self._install_agent_scripts()
             
+            # Connect signals
+            self.browser.urlChanged.connect(self.update_url)
+            self.page.loadStarted.connect(self._on_load_started)
+            self.page.loadFinished.connect(self.handle_load_finished)
+            self.back_button.clicked.connect(self.browser.back)
+            self.forward_button.clicked.connect(self.browser.forward)
+            self.refresh_button.clicked.connect(self.browser.reload)
+            
+            self._browser_stack.addWidget(self.browser)
+            self._browser_stack.setCurrentWidget(self.browser)
+            
+            # Set default homepage
+            self.browser.setUrl(QUrl(self.default_url))
+            
+        except Exception as e:
+            logger.exception(f"Error creating browser view: {str(e)}")
+
+    def _create_profile(self):
+        """Create the shared browser profile: persistent by default, off-the-record with PRIVATE_PROFILE."""
+        # Parented to the application so it outlives every page that uses it
+        if PRIVATE_PROFILE:
+            # A profile without a storage name is off-the-record
+            profile = QWebEngineProfile(QApplication.instance())
+            profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+            profile.setHttpCacheMaximumSize(PRIVATE_PROFILE_CACHE_SIZE)
+            profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies)
+            return profile
+        
+        profile = QWebEngineProfile(PROFILE_NAME, QApplication.instance())
+        # Cookies and cache are private to the user who runs the browser
+        for path in (profile.persistentStoragePath(), profile.cachePath()):
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            os.chmod(path, 0o700)
+        profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+        profile.setHttpCacheMaximumSize(PROFILE_CACHE_SIZE)
+        profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+        return profile
+
+    @staticmethod
+    def _configure_web_settings(settings):
+        """Turn off page features the assistant never needs, to save CPU and GPU work."""
+        attribute = QWebEngineSettings.WebAttribute
+        settings.setAttribute(attribute.WebGLEnabled, False)
+        settings.setAttribute(attribute.PluginsEnabled, False)
+        settings.setAttribute(attribute.Accelerated2dCanvasEnabled, True)
+
+    def _warm_up_gemini(self):
+        """Create the Gemini integration ahead of the first message (runs on the Gemini pool)."""
+        try:
+            self.gemini  # The property builds the integration on first access
         except Exception as e:
-            logger.error(f"Error in BrowserWindow.init_ui: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error initializing Gemini integration: {str(e)}")
             
+    @property
+    def gemini(self):
+        """Gemini integration, created on first use (only touched from the Gemini pool)."""
+        if self._gemini is None:
+            self._gemini = GeminiIntegration()
+            logger.info("Gemini integration initialized")
+        return self._gemini
+
+    def _install_agent_scripts(self):
+        """Register the action helpers and the web channel client as user scripts on the page."""
+        bridge_source = self._read_qwebchannel_js() + '\n' + _AGENT_BRIDGE_JS
+        for name, source in _AGENT_SCRIPTS + (('agent-bridge', bridge_source),):
+            script = QWebEngineScript()
+            script.setName(name)
+            script.setSourceCode(source)
+            # Helpers only define functions, so they can run before the DOM exists
+            script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+            script.setWorldId(QWebEngineScript.ScriptWorldId.MainWorld)
+            script.setRunsOnSubFrames(False)
+            self.page.scripts().insert(script)
+
+    @staticmethod
+    def _read_qwebchannel_js():
+        """Return the source of the qwebchannel.js client bundled with QtWebEngine."""
+        qwebchannel = QFile(_QWEBCHANNEL_JS_PATH)
+        if not qwebchannel.open(QIODevice.OpenModeFlag.ReadOnly):
+            raise RuntimeError(f"Could not open {_QWEBCHANNEL_JS_PATH}")
+        try:
+            return bytes(qwebchannel.readAll()).decode('utf-8')
+        finally:
+            qwebchannel.close()
+
     def navigate_to_url(self, url=None):
         """Navigate to a URL"""
         try:
             if url is None:
                 url = self.url_bar.text()
-            
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
+            url = _ensure_scheme(url)
             
             logger.info(f"Navigating to: {url}")
             self.page_load_complete = False  # Reset page load state
-            self.browser.setUrl(QUrl(url))
+            # fromUserInput tidies typed URLs (spaces, IDN hosts) in Qt's own parser
+            self.browser.setUrl(QUrl.fromUserInput(url))
             
         except Exception as e:
-            logger.error(f"Error in navigate_to_url: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            self.chat_history.append(f"Error navigating to URL: {str(e)}")
+            logger.exception(f"Error in navigate_to_url: {str(e)}")
+            self._append_chat(f"Error navigating to URL: {str(e)}")
 
     def update_url(self, url):
-        """Update URL bar with current URL"""
+        """Schedule a URL bar update with the current URL"""
+        self._pending_url = url.toString()
+        self._url_timer.start()
+
+    def _flush_url(self):
+        """Write the latest pending URL into the URL bar"""
         try:
-            if hasattr(self, 'url_bar'):
-                self.url_bar.setText(url.toString())
+            if self._pending_url is not None and hasattr(self, 'url_bar'):
+                self.url_bar.setText(self._pending_url)
                 self.url_bar.setCursorPosition(0)
+            self._pending_url = None
         except Exception as e:
             logger.error(f"Error in update_url: {str(e)}")
 
@@ -214,53 +991,98 @@ class BrowserWindow(QMainWindow):
             self.chat_input.clear()
             
             # Add to chat history
-            self.chat_history.append(f"You: {message}")
+            self._append_chat(f"You: {message}")
             
-            # Get current URL
-            current_url = self.browser.url().toString()
+            # Get current URL (empty until the web view has been created)
+            current_url = self.browser.url().toString() if self.browser else ''
             
-            # Take screenshot
+            # Take screenshot (reused while the page is known to be unchanged)
             screenshot = None
             if current_url:
-                screenshot = self.capture_screenshot()
+                screenshot = self._chat_screenshot(current_url)
         
-            # Process with Gemini
-            response = self.gemini.process_request(message, current_url, screenshot)
-        
-            # Handle response
+            # Process with Gemini on the worker pool; the reply arrives in _on_gemini_response
+            task = GeminiRequestTask(lambda: self.gemini, message, current_url, screenshot)
+            task.signals.finished.connect(self._on_gemini_response)
+            self._pending_gemini_requests.add(task)
+            self._gemini_pool.start(task)
+        except Exception as e:
+            logger.exception(f"Error in send_message: {e}")
+            self._append_chat(f"Error: {str(e)}")
+
+    def _on_gemini_response(self, task, response):
+        """Show a Gemini response and queue any actions it contains."""
+        self._pending_gemini_requests.discard(task)
+        try:
             if isinstance(response, str):
-                self.chat_history.append(f"Assistant: {response}")
+                self._append_chat(f"Assistant: {response}")
             elif isinstance(response, dict):
                 # First handle any message
                 if 'message' in response:
+                    out_lines = []  # Collected so the chat is updated once per response
                     try:
-                        message_lines = response['message'].strip().split('\n')
-                        processed_actions = set()  # Track processed actions
-                        for line in message_lines:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            try:
-                                # Try to parse as JSON
-                                action = json.loads(line)
+                        # Single pass: consume JSON actions (even pretty-printed ones) where
+                        # they start, and everything else as text up to the end of the line
+                        text = response['message']
+                        pos, end = 0, len(text)
+                        while True:
+                            pos = _WHITESPACE_RE.match(text, pos).end()
+                            if pos >= end:
+                                break
+                            if text[pos] == '{':
+                                # Fast path: a whole-line action parsed by orjson; raw_decode
+                                # handles pretty-printed objects and trailing text
+                                line_end = text.find('\n', pos)
+                                candidate = text[pos:end if line_end == -1 else line_end].rstrip()
+                                try:
+                                    action = orjson.loads(candidate)
+                                    action_end = pos + len(candidate)
+                                except orjson.JSONDecodeError:
+                                    try:
+                                        action, action_end = _JSON_DECODER.raw_decode(text, pos)
+                                    except json.JSONDecodeError:
+                                        action = None
                                 if isinstance(action, dict) and 'action' in action:
-                                    # Create unique key for action
-                                    action_key = f"{action['action']}:{action.get('value', '')}:{action.get('url', '')}"
-                                    if action_key not in processed_actions:
-                                        self.queue_action(action)
-                                        processed_actions.add(action_key)
-                                else:
-                                    self.chat_history.append(f"Assistant: {line}")
-                            except json.JSONDecodeError:
-                                # Not JSON, treat as normal message
-                                self.chat_history.append(f"Assistant: {line}")
+                                    self.queue_action(action)  # Duplicates are dropped there
+                                    pos = action_end
+                                    continue
+                            line_end = text.find('\n', pos)
+                            if line_end == -1:
+                                line_end = end
+                            out_lines.append(f"Assistant: {text[pos:line_end].strip()}")
+                            pos = line_end + 1
                     except Exception as e:
                         logger.error(f"Error processing message: {e}")
-                        self.chat_history.append(f"Error processing message: {str(e)}")
+                        out_lines.append(f"Error processing message: {str(e)}")
+                    self._append_chat(*out_lines)
         except Exception as e:
-            logger.error(f"Error in send_message: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            self.chat_history.append(f"Error: {str(e)}")
+            logger.exception(f"Error handling Gemini response: {e}")
+            self._append_chat(f"Error: {str(e)}")
+
+    def _append_chat(self, *lines):
+        """Queue lines for the chat history; they are written on the next flush."""
+        if not lines:
+            return
+        self._chat_buffer.extend(lines)
+        if not self._chat_flush_timer.isActive():
+            self._chat_flush_timer.start()
+
+    def _flush_chat(self):
+        """Write all buffered chat lines in a single layout pass."""
+        if not self._chat_buffer:
+            return
+        lines, self._chat_buffer = self._chat_buffer, []
+        cursor = self._chat_cursor
+        self.chat_history.setUpdatesEnabled(False)
+        try:
+            # Same block layout as appendPlainText, without a new cursor per call
+            if not cursor.atStart():
+                cursor.insertBlock()
+            cursor.insertText('\n'.join(lines))
+        finally:
+            self.chat_history.setUpdatesEnabled(True)
+        scroll_bar = self.chat_history.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
 
     def queue_action(self, action_data):
         """Add an action to the queue for processing."""
@@ -274,22 +1096,38 @@ class BrowserWindow(QMainWindow):
                 logger.error("No action type specified")
                 return False
                 
-            logger.info(f"Queueing action: {action_data}")
+            key = self._action_key(action_data)
+            if key in self._queued_keys:
+                logger.info("Skipping duplicate queued action: %s", action_data)
+                return False
+            
+            logger.info("Queueing action: %s", action_data)
+            self._queued_keys.add(key)
             self.action_queue.append(action_data)
             
-            # Start processing if not already running
-            if not self.action_timer.isActive():
-                self.action_timer.start()
+            # Kick the queue from the event loop; it re-arms itself while work remains
+            QTimer.singleShot(0, self._process_action_queue)
             
             return True
             
         except Exception as e:
-            logger.error(f"Error queueing action: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error queueing action: {e}")
             return False
 
+    @staticmethod
+    def _action_key(action_data):
+        """Key identifying duplicate actions in the queue (every field counts)."""
+        return orjson.dumps(action_data, option=orjson.OPT_SORT_KEYS)
+
+    def _dequeue_action(self):
+        """Remove the action at the head of the queue."""
+        self._queued_keys.discard(self._action_key(self.action_queue.popleft()))
+
     def _process_action_queue(self):
         """Process the next action in the queue if possible."""
+        action = None
+        started = False  # This call claimed action_in_progress
+        handed_off = False  # A result callback, timer or _finish_action will release it
         try:
             if self.action_in_progress:
                 logger.debug("Action in progress, waiting...")
@@ -301,43 +1139,116 @@ class BrowserWindow(QMainWindow):
                 
             if not self.action_queue:
                 logger.info("No actions in queue")
-                self.action_timer.stop()
                 return
                 
             self.action_in_progress = True
+            started = True
+            self._action_seq += 1
+            self._page_version += 1  # Actions may change the page
+            self._awaiting_js_result = False
             
+            batch = self._next_action_batch()
+            if len(batch) > 1:
+                self._run_action_batch(batch)
+                seq = self._action_seq
+                QTimer.singleShot(self._result_timeout_ms(batch), lambda: self._finish_action(seq))
+                handed_off = True
+                return
+
             # Get next action
             action = self.action_queue[0]  # Peek at next action without removing
-            logger.info(f"Processing next action: {action}")
+            logger.info("Processing next action: %s", action)
             
             # Process action
             success = self.process_action(action)
             if success:
-                self.action_queue.pop(0)  # Only remove if successful
+                self._dequeue_action()  # Only remove if successful
                 logger.info("Action processed successfully")
             else:
                 logger.error(f"Failed to process action: {action}")
-                self.chat_history.append("Error: Failed to execute action")
-                self.action_queue.pop(0)  # Remove failed action to prevent blocking
-        
-            # Reset action state
-            self.action_in_progress = False
+                self._append_chat("Error: Failed to execute action")
+                self._dequeue_action()  # Remove failed action to prevent blocking
             
-            # Process next action if available
-            if self.action_queue:
-                QTimer.singleShot(500, self._process_action_queue)  # Schedule next action with delay
+            if success and self._awaiting_js_result:
+                # The result callback continues the queue; the timer only covers a lost callback
+                seq = self._action_seq
+                QTimer.singleShot(self._result_timeout_ms([action]), lambda: self._finish_action(seq))
+            else:
+                self._finish_action(self._action_seq)
+            handed_off = True
             
         except Exception as e:
-            logger.error(f"Error processing action queue: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            self.action_in_progress = False
-            if self.action_queue:
-                self.action_queue.pop(0)  # Remove problematic action
+            logger.exception(f"Error processing action queue: {e}")
+            if action is not None and self.action_queue and self.action_queue[0] is action:
+                self._dequeue_action()  # Remove problematic action
+        finally:
+            if started and not handed_off:
+                # Release the queue and move on so one bad action cannot stall it
+                self.action_in_progress = False
+                if self.action_queue:
+                    QTimer.singleShot(0, self._process_action_queue)
+
+    @staticmethod
+    def _wait_timeout(action_data):
+        """Seconds a wait action may run in the page."""
+        try:
+            return max(0.0, float(action_data.get('timeout', DEFAULT_WAIT_TIMEOUT)))
+        except (TypeError, ValueError):
+            return DEFAULT_WAIT_TIMEOUT
+
+    def _result_timeout_ms(self, actions):
+        """Fallback delay for actions run in the page: their wait timeouts plus a margin."""
+        waits = sum(self._wait_timeout(action) for action in actions if action.get('action') == 'wait')
+        return ACTION_RESULT_TIMEOUT_MS + int(waits * 1000)
+
+    def _next_action_batch(self):
+        """Return the leading queued actions that can run in the page in one call."""
+        batch = []
+        for action in self.action_queue:
+            action_type = action.get('action') if isinstance(action, dict) else None
+            if action_type not in _BATCHABLE_ACTIONS and action_type not in _BATCH_ENDING_ACTIONS:
+                break
+            batch.append(action)
+            if action_type in _BATCH_ENDING_ACTIONS:
+                break
+        return batch
+
+    def _run_action_batch(self, batch):
+        """Send a batch of page actions to the page in a single bridge call."""
+        logger.info("Processing %d actions in one batch", len(batch))
+        steps = []
+        handlers = []
+        for action in batch:
+            self._dequeue_action()
+            name, args, handler = self._page_action(action)
+            steps.append([name, args])
+            handlers.append(handler)
+
+        def handle_batch_result(results):
+            # Fan the per-action results out to the usual handlers
+            if not isinstance(results, list):
+                results = [results] * len(handlers)
+            for handler, result in zip(handlers, results):
+                handler(result)
+
+        self._run_helper('Batch', [steps], handle_batch_result)
+
+    def _run_helper(self, name, args, handler):
+        """Ask the page to run window.__agent<name>(*args); handler gets the awaited result."""
+        self._bridge_call_id += 1
+        self._bridge_callbacks[self._bridge_call_id] = self._continue_after(handler)
+        self.bridge.runAction.emit(self._bridge_call_id, name, args)
+
+    def _on_bridge_result(self, call_id, result):
+        """Pass a helper result reported by the page to its waiting handler."""
+        callback = self._bridge_callbacks.pop(call_id, None)
+        if callback is not None:
+            callback(result)
 
     def process_action(self, action_data):
         """Process a single action from the model."""
         try:
-            logger.info(f"Processing action: {action_data}")
+            logger.info("Processing action: %s", action_data)
             
             if not isinstance(action_data, dict):
                 logger.error(f"Invalid action data type: {type(action_data)}")
@@ -349,570 +1260,122 @@ class BrowserWindow(QMainWindow):
                 return False
             
             if action_type == 'navigate':
-                url = action_data.get('url', '')
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-                self.navigate_to_url(url)
-                return True
-                
-            elif action_type == 'search':
-                value = action_data.get('value', '')
-                
-                # Run JavaScript to fill input and submit
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        // Enhanced element finder with more selectors
-                        function findSearchInput() {{
-                            // Common search input selectors
-                            const searchSelectors = [
-                                // Standard search inputs
-                                'input[type="search"]',
-                                'input[type="text"]',
-                                'input[name="q"]',
-                                'input[name="query"]',
-                                'input[name="search"]',
-                                'input[name="symbol"]', // For trading platforms
-                                'input[name="ticker"]', // For trading platforms
-                                
-                                // Inputs with search-related attributes
-                                'input[placeholder*="search" i]',
-                                'input[placeholder*="symbol" i]',
-                                'input[placeholder*="ticker" i]',
-                                'input[aria-label*="search" i]',
-                                'input[title*="search" i]',
-                                
-                                // Trading platform specific
-                                '.tv-search-row__input input',  // TradingView
-                                '.js-search-input',             // Common class
-                                '#symbol-search',               // Common ID
-                                
-                                // Common e-commerce search
-                                '#gh-ac',                       // eBay
-                                '#twotabsearchtextbox',         // Amazon
-                                'input[name="st"]',             // Common store search
-                                
-                                // Fallbacks
-                                'textarea[placeholder*="search" i]',
-                                'input[role="searchbox"]',
-                                'input[role="combobox"]',
-                                '[contenteditable="true"]',
-                                'input'
-                            ];
-                            
-                            // Try each selector
-                            for (const selector of searchSelectors) {{
-                                const elements = document.querySelectorAll(selector);
-                                for (const el of elements) {{
-                                    const style = window.getComputedStyle(el);
-                                    const rect = el.getBoundingClientRect();
-                                    const isVisible = style.display !== 'none' && 
-                                                   style.visibility !== 'hidden' && 
-                                                   el.offsetParent !== null &&
-                                                   rect.width > 0 &&
-                                                   rect.height > 0;
-                                    
-                                    if (isVisible) {{
-                                        console.log('Found search input:', el);
-                                        return el;
-                                    }}
-                                }}
-                            }}
-                            return null;
-                        }}
-
-                        // Find search input
-                        const searchInput = findSearchInput();
-                        if (!searchInput) {{
-                            throw new Error('No search input found');
-                        }}
-
-                        // Focus and fill the input
-                        searchInput.focus();
-                        searchInput.value = "{value}";
-                        searchInput.dispatchEvent(new Event('input', {{ bubbles: true }}));
-
-                        // Try to find and click a search button
-                        const searchButtonSelectors = [
-                            'button[type="submit"]',
-                            'input[type="submit"]',
-                            'button[aria-label*="search" i]',
-                            'button[title*="search" i]',
-                            '.search-button',
-                            '.searchButton',
-                            '#search-button',
-                            '[role="search"] button'
-                        ];
-
-                        let searchButton = null;
-                        for (const selector of searchButtonSelectors) {{
-                            const button = document.querySelector(selector);
-                            if (button) {{
-                                const style = window.getComputedStyle(button);
-                                if (style.display !== 'none' && style.visibility !== 'hidden') {{
-                                    searchButton = button;
-                                    break;
-                                }}
-                            }}
-                        }}
-
-                        // Click the search button if found, otherwise submit the form
-                        if (searchButton) {{
-                            searchButton.click();
-                        }} else {{
-                            const form = searchInput.closest('form');
-                            if (form) {{
-                                form.submit();
-                            }} else {{
-                                searchInput.dispatchEvent(new KeyboardEvent('keydown', {{ key: 'Enter', code: 'Enter', keyCode: 13, bubbles: true }}));
-                            }}
-                        }}
-
-                        return {{
-                            success: true,
-                            message: `Successfully filled search input with: {value}`,
-                            details: {{
-                                inputType: searchInput.type,
-                                inputName: searchInput.name,
-                                inputId: searchInput.id
-                            }}
-                        }};
-                    }} catch (error) {{
-                        console.error('Search error:', error);
-                        return {{
-                            success: false,
-                            error: error.toString(),
-                            details: {{ message: error.message }}
-                        }};
-                    }}
-                }})();
-                """
-
-                def handle_search_result(result):
-                    if isinstance(result, dict):
-                        if result.get('success'):
-                            logger.info(f"Search successful: {result.get('message', '')}")
-                            logger.info(f"Input details: {result.get('details', {})}")
-                        else:
-                            error = result.get('error', 'Unknown error')
-                            details = result.get('details', {})
-                            logger.error(f"Search failed: {error}")
-                            logger.error(f"Error details: {details}")
-                            self.chat_history.append(f"Error: {error}")
-                    else:
-                        logger.error(f"Unexpected result type: {type(result)}")
-                        self.chat_history.append("Error: Unexpected response type")
-
-                self.page.runJavaScript(js_code, handle_search_result)
-                return True
-                
-            elif action_type == 'click':
-                value = action_data.get('value', '')
-                
-                # Run JavaScript to find and click element
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        // Platform-specific selectors for TradingView
-                        const tradingViewSelectors = [
-                            '.tv-symbol-price-quote__name',  // Symbol name
-                            '.tv-category-header__title',    // Section headers
-                            '.tv-symbol-header__text',       // Symbol header
-                            '.tv-screener__symbol',          // Screener symbols
-                            '.tv-chart-view__title',         // Chart title
-                            '.tv-dialog__title',             // Dialog titles
-                            '.tv-market-status__label',      // Market status
-                            '.js-button-text',               // Button text
-                            '.tv-control-input__input'       // Input controls
-                        ];
-                        
-                        // Common clickable elements
-                        const commonSelectors = [
-                            'a', 'button', 'input[type="submit"]', 'input[type="button"]',
-                            '[role="button"]', '[tabindex]', '[role="link"]', '[role="tab"]',
-                            '[role="menuitem"]'
-                        ];
-                        
-                        // Combine all selectors
-                        const allSelectors = [...tradingViewSelectors, ...commonSelectors];
-                        
-                        // Find all potential elements
-                        const elements = Array.from(document.querySelectorAll(allSelectors.join(',')));
-                        let targetElement = null;
-                        
-                        // Find visible element with matching text
-                        for (const el of elements) {{
-                            const style = window.getComputedStyle(el);
-                            const rect = el.getBoundingClientRect();
-                            const isVisible = style.display !== 'none' && 
-                                           style.visibility !== 'hidden' && 
-                                           el.offsetParent !== null &&
-                                           rect.width > 0 &&
-                                           rect.height > 0;
-                            
-                            if (!isVisible) continue;
-                            
-                            // Check text content and attributes
-                            const elementText = (
-                                el.textContent?.trim() ||
-                                el.value?.trim() ||
-                                el.getAttribute('aria-label')?.trim() ||
-                                el.getAttribute('title')?.trim() ||
-                                el.getAttribute('alt')?.trim() ||
-                                el.getAttribute('data-symbol')?.trim() || // For TradingView symbols
-                                el.getAttribute('data-name')?.trim() ||   // For TradingView elements
-                                ''
-                            ).toLowerCase();
-                            
-                            const searchText = "{value}".toLowerCase();
-                            if (elementText.includes(searchText)) {{
-                                targetElement = el;
-                                break;
-                            }}
-                        }}
-                        
-                        if (!targetElement) {{
-                            throw new Error(`No clickable element found with text: {value}`);
-                        }}
-                        
-                        // Scroll element into view
-                        targetElement.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                        await new Promise(resolve => setTimeout(resolve, 500));
-                        
-                        // Click the element
-                        targetElement.focus();
-                        targetElement.click();
-                        
-                        // For TradingView, also try to trigger a custom event
-                        if (window.TradingView) {{
-                            targetElement.dispatchEvent(new CustomEvent('tv-action'));
-                        }}
-                        
-                        return {{ 
-                            success: true, 
-                            message: `Successfully clicked element with text: {value}`,
-                            details: {{
-                                tagName: targetElement.tagName,
-                                className: targetElement.className,
-                                id: targetElement.id
-                            }}
-                        }};
-                    }} catch (error) {{
-                        console.error('Click error:', error);
-                        return {{ 
-                            success: false, 
-                            error: error.toString(),
-                            details: {{ message: error.message }}
-                        }};
-                    }}
-                }})();
-                """
-                
-                def handle_click_result(result):
-                    if isinstance(result, dict):
-                        if result.get('success'):
-                            logger.info(f"Click successful: {result.get('message', '')}")
-                            logger.info(f"Clicked element details: {result.get('details', {})}")
-                        else:
-                            error = result.get('error', 'Unknown error')
-                            details = result.get('details', {})
-                            logger.error(f"Click failed: {error}")
-                            logger.error(f"Error details: {details}")
-                            self.chat_history.append(f"Error: {error}")
-                    else:
-                        logger.error(f"Unexpected result type: {type(result)}")
-                        self.chat_history.append("Error: Unexpected response type")
-                
-                self.page.runJavaScript(js_code, handle_click_result)
+                self.navigate_to_url(action_data.get('url', ''))
                 return True
                 
             elif action_type == 'respond':
                 message = action_data.get('message', '')
                 if message:
-                    self.chat_history.append(f"Assistant: {message}")
-                return True
-                
-            elif action_type == 'fill':
-                # Fill a form field by label or placeholder
-                field = action_data.get('field', '')
-                value = action_data.get('value', '')
-                
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        // Find form field by label or placeholder
-                        const field = document.evaluate(
-                            `//input[@placeholder[contains(., "{field}")] or @aria-label[contains(., "{field}")]] | 
-                             //textarea[@placeholder[contains(., "{field}")] or @aria-label[contains(., "{field}")]] |
-                             //label[contains(text(), "{field}")]/following::input[1] |
-                             //label[contains(text(), "{field}")]/following::textarea[1]`,
-                            document,
-                            null,
-                            XPathResult.FIRST_ORDERED_NODE_TYPE,
-                            null
-                        ).singleNodeValue;
-                        
-                        if (!field) {{
-                            return {{ success: false, error: `Could not find field: {field}` }};
-                        }}
-                        
-                        // Focus and fill the field
-                        field.focus();
-                        field.value = "{value}";
-                        field.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                        field.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        
-                        return {{ success: true }};
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        return {{ success: false, error: error.toString() }};
-                    }}
-                }})();
-                """
-                
-                def handle_fill_result(result):
-                    try:
-                        if isinstance(result, dict):
-                            if result.get('success'):
-                                logger.info(f"Successfully filled field '{field}' with value: {value}")
-                            else:
-                                error = result.get('error', 'Unknown error')
-                                logger.warning(f"Failed to fill field: {error}")
-                                self.chat_history.append(f"Error: {error}")
-                        else:
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            self.chat_history.append("Error: Unexpected response from page")
-                    except Exception as e:
-                        logger.error(f"Error in handle_fill_result: {e}")
-                        self.chat_history.append(f"Error processing result: {str(e)}")
-                
-                self.page.runJavaScript(js_code, handle_fill_result)
-                return True
-
-            elif action_type == 'select':
-                # Select an option from a dropdown
-                field = action_data.get('field', '')
-                value = action_data.get('value', '')
-                
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        // Find select element by label or name
-                        const select = document.evaluate(
-                            `//select[@name[contains(., "{field}")] or @aria-label[contains(., "{field}")]] |
-                             //label[contains(text(), "{field}")]/following::select[1]`,
-                            document,
-                            null,
-                            XPathResult.FIRST_ORDERED_NODE_TYPE,
-                            null
-                        ).singleNodeValue;
-                        
-                        if (!select) {{
-                            return {{ success: false, error: `Could not find dropdown: {field}` }};
-                        }}
-                        
-                        // Find matching option
-                        const options = Array.from(select.options);
-                        const option = options.find(opt => 
-                            opt.text.toLowerCase().includes("{value}".toLowerCase()) ||
-                            opt.value.toLowerCase().includes("{value}".toLowerCase())
-                        );
-                        
-                        if (!option) {{
-                            return {{ success: false, error: `Could not find option: {value}` }};
-                        }}
-                        
-                        // Select the option
-                        select.value = option.value;
-                        select.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        
-                        return {{ success: true }};
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        return {{ success: false, error: error.toString() }};
-                    }}
-                }})();
-                """
-                
-                def handle_select_result(result):
-                    try:
-                        if isinstance(result, dict):
-                            if result.get('success'):
-                                logger.info(f"Successfully selected '{value}' in dropdown '{field}'")
-                            else:
-                                error = result.get('error', 'Unknown error')
-                                logger.warning(f"Failed to select option: {error}")
-                                self.chat_history.append(f"Error: {error}")
-                        else:
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            self.chat_history.append("Error: Unexpected response from page")
-                    except Exception as e:
-                        logger.error(f"Error in handle_select_result: {e}")
-                        self.chat_history.append(f"Error processing result: {str(e)}")
-                
-                self.page.runJavaScript(js_code, handle_select_result)
+                    self._append_chat(f"Assistant: {message}")
                 return True
 
-            elif action_type == 'hover':
-                # Hover over an element
-                selector = action_data.get('selector', '')
-                
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        const element = document.querySelector('{selector}');
-                        if (!element) {{
-                            return {{ success: false, error: `Could not find element: {selector}` }};
-                        }}
-                        
-                        // Trigger hover events
-                        element.dispatchEvent(new MouseEvent('mouseover', {{ bubbles: true }}));
-                        element.dispatchEvent(new MouseEvent('mouseenter', {{ bubbles: true }}));
-                        
-                        return {{ success: true }};
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        return {{ success: false, error: error.toString() }};
-                    }}
-                }})();
-                """
-                
-                def handle_hover_result(result):
-                    try:
-                        if isinstance(result, dict):
-                            if result.get('success'):
-                                logger.info(f"Successfully hovered over element: {selector}")
-                            else:
-                                error = result.get('error', 'Unknown error')
-                                logger.warning(f"Failed to hover: {error}")
-                                self.chat_history.append(f"Error: {error}")
-                        else:
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            self.chat_history.append("Error: Unexpected response from page")
-                    except Exception as e:
-                        logger.error(f"Error in handle_hover_result: {e}")
-                        self.chat_history.append(f"Error processing result: {str(e)}")
-                
-                self.page.runJavaScript(js_code, handle_hover_result)
-                return True
-
-            elif action_type == 'wait':
-                # Wait for an element to appear
-                selector = action_data.get('selector', '')
-                timeout = action_data.get('timeout', 10)  # Default 10 seconds
-                
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        function waitForElement(selector, timeout) {{
-                            return new Promise((resolve, reject) => {{
-                                const startTime = Date.now();
-                                
-                                function checkElement() {{
-                                    const element = document.querySelector(selector);
-                                    if (element) {{
-                                        resolve(element);
-                                    }} else if (Date.now() - startTime > timeout * 1000) {{
-                                        reject(new Error(`Timeout waiting for element: ${{selector}}`));
-                                    }} else {{
-                                        setTimeout(checkElement, 100);
-                                    }}
-                                }}
-                                
-                                checkElement();
-                            }});
-                        }}
-                        
-                        await waitForElement('{selector}', {timeout});
-                        return {{ success: true }};
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        return {{ success: false, error: error.toString() }};
-                    }}
-                }})();
-                """
-                
-                def handle_wait_result(result):
-                    try:
-                        if isinstance(result, dict):
-                            if result.get('success'):
-                                logger.info(f"Successfully waited for element: {selector}")
-                            else:
-                                error = result.get('error', 'Unknown error')
-                                logger.warning(f"Wait failed: {error}")
-                                self.chat_history.append(f"Error: {error}")
-                        else:
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            self.chat_history.append("Error: Unexpected response from page")
-                    except Exception as e:
-                        logger.error(f"Error in handle_wait_result: {e}")
-                        self.chat_history.append(f"Error processing result: {str(e)}")
-                
-                self.page.runJavaScript(js_code, handle_wait_result)
-                return True
-
-            elif action_type == 'extract':
-                # Extract text content from elements
-                selector = action_data.get('selector', '')
-                attribute = action_data.get('attribute', 'textContent')  # Default to text content
-                
-                js_code = f"""
-                (async function() {{
-                    try {{
-                        const elements = Array.from(document.querySelectorAll('{selector}'));
-                        if (elements.length === 0) {{
-                            return {{ success: false, error: `No elements found matching: {selector}` }};
-                        }}
-                        
-                        const results = elements.map(el => {{
-                            if ('{attribute}' === 'textContent') {{
-                                return el.textContent.trim();
-                            }} else {{
-                                return el.getAttribute('{attribute}');
-                            }}
-                        }}).filter(Boolean);
-                        
-                        return {{ success: true, data: results }};
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        return {{ success: false, error: error.toString() }};
-                    }}
-                }})();
-                """
-                
-                def handle_extract_result(result):
-                    try:
-                        if isinstance(result, dict):
-                            if result.get('success'):
-                                data = result.get('data', [])
-                                logger.info(f"Successfully extracted {len(data)} items")
-                                self.chat_history.append(f"Extracted content: {data}")
-                            else:
-                                error = result.get('error', 'Unknown error')
-                                logger.warning(f"Extraction failed: {error}")
-                                self.chat_history.append(f"Error: {error}")
-                        else:
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            self.chat_history.append("Error: Unexpected response from page")
-                    except Exception as e:
-                        logger.error(f"Error in handle_extract_result: {e}")
-                        self.chat_history.append(f"Error processing result: {str(e)}")
-                
-                self.page.runJavaScript(js_code, handle_extract_result)
-                return True
-
-            else:
+            page_action = self._page_action(action_data)
+            if page_action is None:
                 logger.error(f"Unknown action type: {action_type}")
                 return False
+
+            self._run_helper(*page_action)
+            return True
                 
         except Exception as e:
-            logger.error(f"Error processing action: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error processing action: {e}")
             return False
 
-    def js_console_log(self, message):
-        """Handle console.log messages from JavaScript."""
-        logger.info(f"JS Console: {message}")
+    def _page_action(self, action_data):
+        """Return (helper name, arguments, result handler) for an action run inside the page, or None."""
+        action_type = action_data.get('action')
+
+        if action_type == 'search':
+            value = action_data.get('value', '')
+
+            # Run the preinstalled helper to fill input and submit
+            return 'Search', [value], self._result_handler('search', lambda result: logger.info(
+                "Search successful: %s %s", result.get('message', ''), result.get('details', {})))
+
+        elif action_type == 'click':
+            value = action_data.get('value', '')
+
+            # Run the preinstalled helper to find and click element
+            return 'Click', [value], self._result_handler('click', lambda result: logger.info(
+                "Click successful: %s %s", result.get('message', ''), result.get('details', {})))
+
+        elif action_type == 'fill':
+            # Fill a form field by label or placeholder
+            field = action_data.get('field', '')
+            value = action_data.get('value', '')
+
+            return 'Fill', [field, value], self._result_handler('fill', lambda result: logger.info(
+                "Successfully filled field '%s' with value: %s", field, value))
+
+        elif action_type == 'select':
+            # Select an option from a dropdown
+            field = action_data.get('field', '')
+            value = action_data.get('value', '')
+
+            return 'Select', [field, value], self._result_handler('select', lambda result: logger.info(
+                "Successfully selected '%s' in dropdown '%s'", value, field))
+
+        elif action_type == 'hover':
+            # Hover over an element
+            selector = action_data.get('selector', '')
+
+            return 'Hover', [selector], self._result_handler('hover', lambda result: logger.info(
+                "Successfully hovered over element: %s", selector))
+
+        elif action_type == 'wait':
+            # Wait for an element to appear
+            selector = action_data.get('selector', '')
+            timeout = self._wait_timeout(action_data)
+
+            return 'Wait', [selector, timeout], self._result_handler('wait', lambda result: logger.info(
+                "Successfully waited for element: %s", selector))
+
+        elif action_type == 'extract':
+            # Extract text content from elements
+            selector = action_data.get('selector', '')
+            attribute = action_data.get('attribute', 'textContent')  # Default to text content
+
+            return 'Extract', [selector, attribute], self._result_handler(
+                'extract', lambda result: self._show_extracted(selector, result))
+
+        return None
+
+    def _result_handler(self, kind, on_success):
+        """Build the result callback for an action; on_success gets the result dict."""
+        def handle_result(result):
+            try:
+                if not isinstance(result, dict):
+                    logger.warning(f"Unexpected {kind} result type: {type(result)}")
+                    self._append_chat("Error: Unexpected response from page")
+                elif result.get('success'):
+                    on_success(result)
+                else:
+                    error = result.get('error', 'Unknown error')
+                    logger.warning(f"{kind.capitalize()} failed: {error} {result.get('details', '')}")
+                    self._append_chat(f"Error: {error}")
+            except Exception as e:
+                logger.exception(f"Error handling {kind} result: {e}")
+                self._append_chat(f"Error processing result: {str(e)}")
+        return handle_result
+
+    def _show_extracted(self, selector, result):
+        """Publish data returned by an extract action and show a preview in the chat."""
+        data = result.get('data', [])
+        logger.info("Successfully extracted %d items", len(data))
+        self.extraction_ready.emit(selector, data)
+        # Only a preview goes to the chat; large extracts would flood the history
+        more = len(data) - EXTRACT_PREVIEW_ITEMS
+        suffix = f" ... (+{more} more)" if more > 0 else ""
+        self._append_chat(f"Extracted content: {data[:EXTRACT_PREVIEW_ITEMS]}{suffix}")
+
+    def js_console_log(self, messages):
+        """Handle a batch of console.log messages from JavaScript."""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("JS Console: " + "\nJS Console: ".join(messages))
+
+    def _on_js_alert(self, msg):
+        """Show a JavaScript alert in the chat."""
+        self._append_chat(f"Alert: {msg}")
 
     def handle_js_result(self, result):
         """Handle the result of JavaScript execution."""
@@ -928,12 +1391,36 @@ class BrowserWindow(QMainWindow):
             else:
                 logger.warning("JavaScript execution failed")
                 if hasattr(self, 'pending_search'):
-                    self.chat_history.append("Could not find search input")
+                    self._append_chat("Could not find search input")
                     self.pending_search = None
                     self.search_selector = None
         except Exception as e:
-            logger.error(f"Error handling JavaScript result: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error handling JavaScript result: {e}")
+
+    def _continue_after(self, handler):
+        """Wrap a result callback so the queue advances once it has run."""
+        seq = self._action_seq
+        self._awaiting_js_result = True
+
+        def callback(result):
+            try:
+                handler(result)
+            finally:
+                self._finish_action(seq)
+        return callback
+
+    def _finish_action(self, seq):
+        """Mark action seq as done and dispatch the next queued action."""
+        if seq != self._action_seq or not self.action_in_progress:
+            return  # Already finished (result arrived after the fallback, or vice versa)
+        self.action_in_progress = False
+        if self.action_queue:
+            QTimer.singleShot(0, self._process_action_queue)
+
+    def _on_load_started(self):
+        """Hold the action queue while a navigation is in progress."""
+        self.page_load_complete = False
+        self._page_version += 1
 
     def handle_load_finished(self, ok):
         """Handle page load finished event."""
@@ -941,116 +1428,185 @@ class BrowserWindow(QMainWindow):
             if ok:
                 logger.info("Page load complete")
                 self.page_load_complete = True
+                self._page_version += 1
                 
-                # Take a screenshot after load
-                self.capture_and_send_screenshot()
+                # Results from the previous document can no longer arrive
+                if self._bridge_callbacks:
+                    self._bridge_callbacks.clear()
+                    self._finish_action(self._action_seq)
+                
+                # Take a debug screenshot after load, unless the page is unchanged
+                if SAVE_SCREENSHOTS:
+                    self.page.runJavaScript(_DOM_FINGERPRINT_JS, self._on_dom_fingerprint)
                 
                 # Process next action after a short delay to let the page settle
-                QTimer.singleShot(1000, self._process_action_queue)
+                QTimer.singleShot(PAGE_SETTLE_MS, self._process_action_queue)
             else:
                 logger.error("Page load failed")
                 self.page_load_complete = True  # Still mark as complete to allow further actions
-                self.chat_history.append("Error: Page failed to load")
+                self._append_chat("Error: Page failed to load")
+                QTimer.singleShot(0, self._process_action_queue)
         except Exception as e:
-            logger.error(f"Error in handle_load_finished: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error in handle_load_finished: {e}")
+
+    def _on_dom_fingerprint(self, fingerprint):
+        """Capture a post-load screenshot if the page differs from the last one"""
+        if fingerprint and fingerprint == self._last_dom_fingerprint:
+            logger.debug("Page unchanged since last screenshot, skipping capture")
+            return
+        self._last_dom_fingerprint = fingerprint
+        self.capture_and_send_screenshot()
 
     def _take_screenshot(self):
-        """Take a screenshot of the browser view."""
+        """Take a screenshot of the browser view.
+
+        The PNG is encoded on the thread pool and the path is returned before
+        the file exists; _on_screenshot_saved runs when it is written.
+        """
         try:
-            # Create screenshots directory if it doesn't exist
-            if not os.path.exists('screenshots'):
-                os.makedirs('screenshots')
+            # Nothing to capture while the view is hidden or minimized
+            if not self.browser.isVisible():
+                logger.debug("Browser view not visible, skipping screenshot")
+                return None
             
-            # Clean up old screenshots
-            self._cleanup_old_screenshots()
-            
-            # Take new screenshot
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
-            screenshot_path = f"screenshots/screenshot_{timestamp}_{unique_id}.png"
+            # Render on the UI thread (required); skip the encode if the frame is unchanged
+            image = self._render_view()
+            digest = hashlib.blake2b(image.constBits().asstring(image.sizeInBytes()), digest_size=8).digest()
+            if digest == self._last_image_digest and self._last_image_path in self._recent_screenshots:
+                logger.debug("Browser view unchanged, reusing previous screenshot")
+                return self._last_image_path
             
             # Take screenshot of browser view
-            self.browser.grab().save(screenshot_path)
-            logger.info(f"Screenshot saved: {screenshot_path}")
+            screenshot_path = self._new_screenshot_path()
+            self._last_image_digest, self._last_image_path = digest, screenshot_path
+            # Encode a private copy on a worker thread: the render target is painted
+            # again by the next capture while the worker may still be reading it
+            task = ScreenshotSaveTask(image.copy(), screenshot_path)
+            task.signals.finished.connect(self._on_screenshot_saved)
+            self._pending_screenshot_saves[screenshot_path] = task
+            QThreadPool.globalInstance().start(task)
+            self._remember_screenshot(screenshot_path)
             return screenshot_path
             
         except Exception as e:
-            logger.error(f"Error taking screenshot: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error taking screenshot: {e}")
             return None
 
+    def _chat_screenshot(self, current_url):
+        """Return JPEG bytes of the page, reusing the last capture if nothing changed"""
+        shot_key = (current_url, self._page_version)
+        if shot_key == self._last_shot_key and self._last_shot_bytes:
+            logger.debug("Page unchanged since the last message, reusing screenshot")
+            return self._last_shot_bytes
+        screenshot = self._grab_screenshot_jpeg()
+        self._last_shot_key, self._last_shot_bytes = shot_key, screenshot
+        return screenshot
+
+    def _grab_screenshot_jpeg(self):
+        """Grab the browser view as downscaled JPEG bytes, without touching disk"""
+        try:
+            if not self.browser.isVisible():
+                logger.debug("Browser view not visible, skipping screenshot")
+                return None
+            
+            image = self._render_view()
+            if max(image.width(), image.height()) > SCREENSHOT_MAX_SIZE:
+                image = image.scaled(
+                    SCREENSHOT_MAX_SIZE, SCREENSHOT_MAX_SIZE,
+                    Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+                )
+            
+            buffer = QBuffer()
+            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            if not image.save(buffer, 'JPEG', SCREENSHOT_JPEG_QUALITY):
+                logger.warning("Failed to encode screenshot")
+                return None
+            return bytes(buffer.data())
+            
+        except Exception as e:
+            logger.exception(f"Error taking screenshot: {e}")
+            return None
+
+    def _render_view(self):
+        """Render the browser view into a reused opaque QImage."""
+        size = self.browser.size()
+        if self._view_image is None or self._view_image.size() != size:
+            # No alpha channel, so nothing needs premultiplying; reallocated only on resize
+            self._view_image = QImage(size, QImage.Format.Format_RGB32)
+        painter = QPainter(self._view_image)
+        try:
+            self.browser.render(painter)
+        finally:
+            painter.end()
+        return self._view_image
+
+    def _new_screenshot_path(self):
+        """Build a unique path for a new screenshot"""
+        return os.path.join(SCREENSHOT_DIR, f"screenshot_{time.time_ns()}.png")
+
     def _cleanup_old_screenshots(self):
-        """Clean up old screenshot files"""
+        """Clean up old screenshot files and return the kept paths, oldest first"""
         try:
-            if not os.path.exists('screenshots'):
-                return
+            if not os.path.exists(SCREENSHOT_DIR):
+                return []
             
-            # Get list of screenshots
-            screenshots = glob.glob('screenshots/*.png')
+            # Get screenshots with their modification times in a single directory pass
+            with os.scandir(SCREENSHOT_DIR) as it:
+                entries = [(entry.stat().st_mtime, entry.path) for entry in it if entry.name.endswith('.png')]
             
             # Sort by modification time
-            screenshots.sort(key=os.path.getmtime)
+            entries.sort()
             
-            # Keep only the 10 most recent screenshots
-            max_screenshots = 10
-            if len(screenshots) > max_screenshots:
-                for screenshot in screenshots[:-max_screenshots]:
-                    try:
-                        os.remove(screenshot)
-                        logger.info(f"Deleted old screenshot: {screenshot}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete screenshot {screenshot}: {e}")
+            # Keep only the most recent screenshots
+            for _, screenshot in entries[:-MAX_SCREENSHOTS]:
+                try:
+                    os.remove(screenshot)
+                    logger.info(f"Deleted old screenshot: {screenshot}")
+                except Exception as e:
+                    logger.warning(f"Failed to delete screenshot {screenshot}: {e}")
+            
+            return [path for _, path in entries[-MAX_SCREENSHOTS:]]
             
         except Exception as e:
             logger.error(f"Error cleaning up screenshots: {e}")
+            return []
+
+    def _remember_screenshot(self, screenshot_path):
+        """Track a new screenshot and delete the oldest one once the cap is reached"""
+        recent = self._recent_screenshots
+        evicted = recent[0] if len(recent) == recent.maxlen else None
+        recent.append(screenshot_path)
+        if evicted:
+            try:
+                os.remove(evicted)
+                logger.info(f"Deleted old screenshot: {evicted}")
+            except OSError as e:
+                logger.warning(f"Failed to delete screenshot {evicted}: {e}")
 
     def capture_and_send_screenshot(self):
-        """Capture screenshot and send to chat history"""
+        """Capture screenshot and send to chat history once it is saved"""
         try:
-            screenshot_path = self._take_screenshot()
-            if screenshot_path and os.path.exists(screenshot_path):
-                self.chat_history.append(f"\nScreenshot saved: {screenshot_path}")
-                logger.info(f"Screenshot captured and saved to {screenshot_path}")
-            else:
+            if not self._take_screenshot():
                 logger.warning("Failed to capture screenshot")
                 
         except Exception as e:
-            logger.error(f"Error capturing screenshot: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            
-    def capture_screenshot(self):
-        """Capture screenshot"""
-        try:
-            # Create screenshots directory if it doesn't exist
-            if not os.path.exists('screenshots'):
-                os.makedirs('screenshots')
-            
-            # Clean up old screenshots
-            self._cleanup_old_screenshots()
-            
-            # Take new screenshot
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
-            screenshot_path = f"screenshots/screenshot_{timestamp}_{unique_id}.png"
-            
-            # Take screenshot of browser view
-            self.browser.grab().save(screenshot_path)
-            logger.info(f"Screenshot saved: {screenshot_path}")
-            return screenshot_path
-            
-        except Exception as e:
-            logger.error(f"Error taking screenshot: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return None
+            logger.exception(f"Error capturing screenshot: {e}")
 
+    def _on_screenshot_saved(self, screenshot_path, ok):
+        """Report a screenshot finished by the background encoder"""
+        self._pending_screenshot_saves.pop(screenshot_path, None)
+        if ok:
+            self._append_chat(f"\nScreenshot saved: {screenshot_path}")
+            logger.info(f"Screenshot captured and saved to {screenshot_path}")
+        else:
+            logger.warning(f"Failed to save screenshot: {screenshot_path}")
+            
     def reset_to_homepage(self):
         """Reset to homepage"""
         try:
             self.browser.setUrl(QUrl(self.default_url))
         except Exception as e:
-            logger.error(f"Error resetting to homepage: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error resetting to homepage: {e}")
 
     def closeEvent(self, event):
         """Handle application close."""
@@ -1059,25 +1615,14 @@ class BrowserWindow(QMainWindow):
             event.accept()
         except Exception as e:
             logger.exception("Error closing application")
-            logger.error(f"Traceback: {traceback.format_exc()}")
             event.accept()
 
 if __name__ == '__main__':
     try:
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('browser.log'),
-                logging.StreamHandler()
-            ]
-        )
-        logger = logging.getLogger(__name__)
-        
         # Create application
         logger.debug("Starting main application")
         app = QApplication(sys.argv)
+        app.setApplicationName(APP_NAME)  # Names the per-user profile directories
         
         # Create and show browser window
         logger.debug("Creating browser window")
@@ -1089,6 +1634,5 @@ if __name__ == '__main__':
         sys.exit(app.exec())
         
     except Exception as e:
-        logger.error(f"Error in main: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error in main: {str(e)}")
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,218 @@
+# core_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def screenshot_digest(path):
+    """Cheap fingerprint of a screenshot file based on its stat information."""
+    try:
+        st = os.stat(path)
+        return f"{path}:{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return None
+
+
+def cache_key(model, task, page_info, screenshot_digest):
+    """Build a sha256 key for an exact-match cache lookup."""
+    payload = json.dumps({
+        "model": model,
+        "task": task,
+        "url": (page_info or {}).get('url'),
+        "title": (page_info or {}).get('title'),
+        "screenshot": screenshot_digest
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Shared storage for cached responses (values must be JSON-serializable)."""
+
+    @abstractmethod
+    def get(self, key):
+        """Return the value stored under key, or None if missing/expired."""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store a value under key, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove key if present."""
+
+
+class SQLiteBackend(CacheBackend):
+    """Single-node cache backend stored in a SQLite file."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisBackend(CacheBackend):
+    """Cache backend shared between workers through Redis."""
+
+    def __init__(self, url, prefix="gemini-cache:"):
+        import redis
+        self._redis = redis.Redis(connection_pool=redis.ConnectionPool.from_url(url))
+        self._prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self._prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._redis.set(self._prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._redis.delete(self._prefix + key)
+
+
+def create_backend(url):
+    """Create a cache backend from a URL (redis://... or sqlite:///path), or None."""
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisBackend(url)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported cache backend URL: {url}")
+
+
+class ExactCache:
+    """Thread-safe LRU cache with lazy TTL expiry."""
+
+    def __init__(self, max_entries=512, ttl=300, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        # Fall back to the shared backend and warm the local LRU
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                logger.warning("Cache backend get failed: %s", e)
+                value = None
+            if value is not None:
+                self._store_local(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store_local(self, key, value):
+        """Insert a value into the in-process LRU."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        """Store a value under key."""
+        self._store_local(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, ttl=self.ttl)
+            except Exception as e:
+                logger.warning("Cache backend set failed: %s", e)
+
+    def stats(self):
+        """Return hit/miss counters for the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one upstream call."""
+
+    def __init__(self):
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        """Run fn once per key; concurrent callers wait for the same result."""
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_leader:
+            logger.info("Waiting on identical in-flight request")
+            return future.result(timeout=timeout)
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
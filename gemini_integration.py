@@ -1,27 +1,106 @@
 # gemini_integration.py
 import os
 import base64
+import hashlib
 import logging
-import json
+from logging.handlers import MemoryHandler
+import orjson
 import re
-from datetime import datetime
-import uuid
 import google.generativeai as genai
-from PIL import Image
 import time
-import traceback
 
-# Configure logging
+# Configure logging; gemini.log records are buffered in memory and written in
+# one go when 1024 have accumulated, an ERROR arrives, or logging shuts down
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+gemini_log_file = logging.FileHandler('gemini.log')
+gemini_log_file.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('gemini.log'),
+        MemoryHandler(1024, flushLevel=logging.ERROR, target=gemini_log_file),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = 'gemini-2.0-flash-thinking-exp-01-21'
+
+# Stable instructions sent once at the start of the chat session, so every turn
+# shares the same prefix (and the history does not repeat it per message)
+SYSTEM_PREAMBLE = """\
+You are an intelligent browser automation assistant that helps users accomplish complex tasks.
+Think and act like a human researcher/assistant would.
+
+Core Capabilities:
+1. Task Planning and Execution
+   - Break down complex tasks into logical steps
+   - Chain multiple actions together to accomplish goals
+   - Maintain context across multiple steps
+   - Handle errors and unexpected situations gracefully
+
+2. Web Navigation and Research
+   - Navigate to any website
+   - Perform searches using site-specific search functionality
+   - Fill out forms and interact with elements
+   - Extract and analyze information
+   - Make informed decisions
+
+3. User Interaction
+   - Keep users informed of your progress
+   - Explain your reasoning and decisions
+   - Ask for clarification when needed
+   - Provide clear summaries and recommendations
+
+Available Actions:
+
+1. Navigate:
+   {"action": "navigate", "url": "https://example.com"}
+   - Use this to navigate to any website
+   - ALWAYS include the full URL with https://
+   - Example: {"action": "navigate", "url": "https://www.craigslist.org"}
+
+2. Search:
+   {"action": "search", "value": "search terms", "selector": "css_selector"}
+   - Use this to search or enter text into any input field
+   - The browser will automatically find the best matching input field if the selector is not exact
+   - Examples:
+     * Generic search: {"action": "search", "value": "ford trucks", "selector": "input[type='search']"}
+     * Form input: {"action": "search", "value": "Hello", "selector": "textarea"}
+
+3. Click:
+   {"action": "click", "selector": "css_selector"}
+   - Use this to click any clickable element (buttons, links, etc)
+   - Example: {"action": "click", "selector": "button[type='submit']"}
+
+4. Think/Respond:
+   {"action": "respond", "message": "your message"}
+   - Use this to:
+     * Share your findings
+     * Explain your next steps
+     * Ask for user input
+     * Provide recommendations
+
+Important Rules:
+1. ALWAYS use the exact JSON format shown above for actions
+2. ALWAYS include https:// in URLs
+3. ONE action per line
+4. Actions must be on their own line
+5. No other content on action lines
+6. For complex tasks, break them down into multiple steps
+   Example: "go to craigslist and find ford trucks" becomes:
+   {"action": "respond", "message": "I'll help you find Ford trucks on Craigslist. First, I'll navigate to Craigslist."}
+   {"action": "navigate", "url": "https://www.craigslist.org"}
+   {"action": "search", "value": "ford trucks", "selector": "input#query"}
+"""
+
+# Opening exchange that carries the instructions: seeds the chat session, and
+# prefixes every stateless (single-turn) action request
+PREAMBLE_HISTORY = [
+    {"role": "user", "parts": [SYSTEM_PREAMBLE]},
+    {"role": "model", "parts": ["Understood. I will reply with one JSON action per line."]}
+]
+
 class GeminiIntegration:
     """Integration with Google's Gemini API."""
 
@@ -41,28 +120,20 @@ class GeminiIntegration:
             logger.info("Configured genai with API key")
             
             # Create model
-            logger.info("Creating model instance: gemini-2.0-flash-thinking-exp-01-21")
-            self.model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp-01-21')
-            
-            # List available models
-            for model in genai.list_models():
-                logger.info(f"Available model: {model.name}")
+            logger.info(f"Creating model instance: {MODEL_NAME}")
+            self.model = genai.GenerativeModel(MODEL_NAME)
             
-            # Create chat session
-            self.chat = self.model.start_chat()
+            # Create chat session, seeded with the instructions
+            self.chat = self.model.start_chat(history=list(PREAMBLE_HISTORY))
             logger.info("Created model instance and chat session")
             
+            # Digest of the last in-memory screenshot, so identical ones are not re-encoded
+            self._last_screenshot_digest = None
+            
             # Add rate limiting
             self.last_request_time = 0
             self.min_request_interval = 2  # Minimum seconds between requests
             
-            # Test the connection
-            test_response = self.chat.send_message("Hello!")
-            if test_response:
-                # Clean the response text for logging
-                clean_text = ''.join(c for c in test_response.text if c.isascii())
-                logger.info(f"Test response: {clean_text}")
-            
             logger.info("Gemini API setup complete")
             
         except Exception as e:
@@ -120,7 +191,7 @@ class GeminiIntegration:
                     response = self.chat.send_message(message)
                     
                     # Clean up screenshot after successful send
-                    if screenshot and os.path.exists(screenshot):
+                    if isinstance(screenshot, str) and os.path.exists(screenshot):
                         try:
                             os.remove(screenshot)
                             logger.info(f"Deleted used screenshot: {screenshot}")
@@ -142,99 +213,48 @@ class GeminiIntegration:
 
         except Exception as e:
             logger.error(f"Error processing request: {e}")
+            # The screenshot may not have reached Gemini, so send the next one again
+            self._last_screenshot_digest = None
             return f"Error: {str(e)}"
 
     def _prepare_message(self, user_input, current_url, screenshot):
-        """Prepare the message for Gemini."""
+        """Prepare the message parts (text, then the screenshot if any) for Gemini."""
         try:
-            # Prepare message parts
-            parts = [{"text": f"""
-            Current page: {current_url or 'No page loaded'}
-            User request: {user_input}
-
-            You are an intelligent browser automation assistant that helps users accomplish complex tasks.
-            Think and act like a human researcher/assistant would.
-
-            Core Capabilities:
-            1. Task Planning and Execution
-               - Break down complex tasks into logical steps
-               - Chain multiple actions together to accomplish goals
-               - Maintain context across multiple steps
-               - Handle errors and unexpected situations gracefully
-
-            2. Web Navigation and Research
-               - Navigate to any website
-               - Perform searches using site-specific search functionality
-               - Fill out forms and interact with elements
-               - Extract and analyze information
-               - Make informed decisions
-
-            3. User Interaction
-               - Keep users informed of your progress
-               - Explain your reasoning and decisions
-               - Ask for clarification when needed
-               - Provide clear summaries and recommendations
-
-            Available Actions:
-
-            1. Navigate:
-               {{"action": "navigate", "url": "https://example.com"}}
-               - Use this to navigate to any website
-               - ALWAYS include the full URL with https://
-               - Example: {{"action": "navigate", "url": "https://www.craigslist.org"}}
-
-            2. Search:
-               {{"action": "search", "value": "search terms", "selector": "css_selector"}}
-               - Use this to search or enter text into any input field
-               - The browser will automatically find the best matching input field if the selector is not exact
-               - Examples:
-                 * Generic search: {{"action": "search", "value": "ford trucks", "selector": "input[type='search']"}}
-                 * Form input: {{"action": "search", "value": "Hello", "selector": "textarea"}}
-
-            3. Click:
-               {{"action": "click", "selector": "css_selector"}}
-               - Use this to click any clickable element (buttons, links, etc)
-               - Example: {{"action": "click", "selector": "button[type='submit']"}}
-
-            4. Think/Respond:
-               {{"action": "respond", "message": "your message"}}
-               - Use this to:
-                 * Share your findings
-                 * Explain your next steps
-                 * Ask for user input
-                 * Provide recommendations
-
-            Important Rules:
-            1. ALWAYS use the exact JSON format shown above for actions
-            2. ALWAYS include https:// in URLs
-            3. ONE action per line
-            4. Actions must be on their own line
-            5. No other content on action lines
-            6. For complex tasks, break them down into multiple steps
-               Example: "go to craigslist and find ford trucks" becomes:
-               {{"action": "respond", "message": "I'll help you find Ford trucks on Craigslist. First, I'll navigate to Craigslist."}}
-               {{"action": "navigate", "url": "https://www.craigslist.org"}}
-               {{"action": "search", "value": "ford trucks", "selector": "input#query"}}
-
-            Now, help the user with their request: {user_input}
-            """}]
-
-            # Add screenshot if available
-            if screenshot and os.path.exists(screenshot):
+            # Prepare message parts (the instructions are already in the chat history)
+            parts = [{"text": (
+                f"Current page: {current_url or 'No page loaded'}\n"
+                f"User request: {user_input}"
+            )}]
+
+            # Add screenshot if available (in-memory JPEG bytes or a PNG file path)
+            if isinstance(screenshot, (bytes, bytearray)):
+                digest = hashlib.sha256(screenshot).hexdigest()
+                if digest == self._last_screenshot_digest:
+                    logger.info("Screenshot unchanged since the previous turn, not re-sending it")
+                else:
+                    self._last_screenshot_digest = digest
+                    parts.append({
+                        "inline_data": {
+                            "mime_type": "image/jpeg",
+                            "data": bytes(screenshot)
+                        }
+                    })
+                    logger.info("Added in-memory screenshot (%d bytes)", len(screenshot))
+            elif screenshot and os.path.exists(screenshot):
                 try:
                     with open(screenshot, 'rb') as img_file:
                         image_data = img_file.read()
                         parts.append({
                             "inline_data": {
                                 "mime_type": "image/png",
-                                "data": base64.b64encode(image_data).decode('utf-8')
+                                "data": image_data
                             }
                         })
-                    logger.info(f"Added screenshot: {screenshot}")
+                    logger.info("Added screenshot: %s", screenshot)
                 except Exception as e:
                     logger.warning(f"Error processing screenshot: {e}")
 
-            return parts[0]['text']
+            return parts
 
         except Exception as e:
             logger.error(f"Error preparing message: {e}")
@@ -274,6 +294,114 @@ class GeminiIntegration:
             logger.error(f"Error processing request: {e}")
             return {"action": "respond", "message": f"Error: {str(e)}"}
 
+    def _build_action_contents(self, task, screenshot_data, page_info):
+        """Build the single-turn contents (instructions, then the task) for an action request.
+
+        Action requests do not go through the chat session, so the reply only
+        depends on the task, the page and the screenshot.
+        """
+        page_info = page_info or {}
+        parts = self._prepare_message(task, page_info.get('url'), None)
+        if not parts:
+            return None
+
+        if screenshot_data:
+            parts.append({
+                "inline_data": {
+                    "mime_type": "image/png",
+                    "data": screenshot_data
+                }
+            })
+        return PREAMBLE_HISTORY + [{"role": "user", "parts": parts}]
+
+    def _rate_limit_delay(self):
+        """Return how long to wait before the next request and record the request time."""
+        current_time = time.time()
+        wait_time = max(0, self.min_request_interval - (current_time - self.last_request_time))
+        if wait_time:
+            logger.info(f"Rate limiting: waiting {wait_time:.2f} seconds")
+        self.last_request_time = current_time + wait_time
+        return wait_time
+
+    def generate_actions_with_gemini(self, task, screenshot_data, page_info):
+        """Generate browser actions for a task using the raw PNG screenshot bytes."""
+        try:
+            contents = self._build_action_contents(task, screenshot_data, page_info)
+            if not contents:
+                return None
+
+            time.sleep(self._rate_limit_delay())
+
+            response = self.model.generate_content(contents)
+            if not response:
+                logger.error("No response from Gemini")
+                return None
+
+            return self._process_response(response.text)
+
+        except Exception as e:
+            logger.error(f"Error generating actions: {e}")
+            return None
+
+    def process_message(self, message):
+        """Send a plain chat message to Gemini and return the reply text."""
+        response = self.send_request(user_input=message)
+        if isinstance(response, dict):
+            return response.get('message', '')
+        return response
+
+    def _parse_action_line(self, line):
+        """Parse a single response line into an action dict, or None."""
+        line = line.strip()
+        
+        # Look for JSON action patterns
+        if not line or '"action":' not in line:
+            return None
+            
+        try:
+            # Try to parse the entire line as JSON
+            action_dict = orjson.loads(line)
+            if isinstance(action_dict, dict) and 'action' in action_dict:
+                return action_dict
+        except orjson.JSONDecodeError:
+            pass
+            
+        # If that fails, try to extract JSON from within the line
+        start_idx = line.find('{')
+        end_idx = line.rfind('}')
+        if start_idx >= 0 and end_idx > start_idx:
+            try:
+                action_dict = orjson.loads(line[start_idx:end_idx + 1])
+                if isinstance(action_dict, dict) and 'action' in action_dict:
+                    return action_dict
+            except orjson.JSONDecodeError:
+                pass
+        return None
+
+    def generate_actions_stream(self, task, screenshot_data, page_info):
+        """Yield actions one at a time as Gemini streams its response."""
+        contents = self._build_action_contents(task, screenshot_data, page_info)
+        if not contents:
+            return
+
+        time.sleep(self._rate_limit_delay())
+
+        response = self.model.generate_content(contents, stream=True)
+
+        # Parse each completed line as soon as its chunk arrives
+        buffer = ''
+        for chunk in response:
+            buffer += chunk.text
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                action = self._parse_action_line(line)
+                if action is not None:
+                    yield action
+
+        action = self._parse_action_line(buffer)
+        if action is not None:
+            yield action
+
     def _process_response(self, response_text):
         """Process the response from Gemini and extract actions."""
         try:
@@ -289,40 +417,17 @@ class GeminiIntegration:
                 if json_end != -1:
                     try:
                         json_str = response_text[json_start:json_end].strip()
-                        json_data = json.loads(json_str)
+                        json_data = orjson.loads(json_str)
                         if isinstance(json_data, dict) and 'action' in json_data:
                             actions.append(json_data)
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         pass
 
             # Look for inline JSON actions
             for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Look for JSON action patterns
-                if '"action":' in line:
-                    try:
-                        # Try to parse the entire line as JSON
-                        action_dict = json.loads(line)
-                        if isinstance(action_dict, dict) and 'action' in action_dict:
-                            actions.append(action_dict)
-                            continue
-                    except json.JSONDecodeError:
-                        pass
-                        
-                    # If that fails, try to extract JSON from within the line
-                    start_idx = line.find('{')
-                    end_idx = line.rfind('}')
-                    if start_idx >= 0 and end_idx > start_idx:
-                        try:
-                            json_str = line[start_idx:end_idx + 1]
-                            action_dict = json.loads(json_str)
-                            if isinstance(action_dict, dict) and 'action' in action_dict:
-                                actions.append(action_dict)
-                        except json.JSONDecodeError:
-                            pass
+                action_dict = self._parse_action_line(line)
+                if action_dict is not None:
+                    actions.append(action_dict)
             
             # If we found actions, return them along with any message
             if actions:
@@ -338,8 +443,7 @@ class GeminiIntegration:
             }
             
         except Exception as e:
-            logger.error(f"Error processing response: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error processing response: {e}")
             return {
                 'message': f"Error processing response: {str(e)}",
                 'actions': []
@@ -435,7 +539,7 @@ class GeminiIntegration:
 
             response = self.chat.send_message(parts[0]['text'])
             text = response.text if hasattr(response, 'text') else str(response)
-            logger.info(f"Generated task plan: {text}")
+            logger.info("Generated task plan: %s", text)
 
             try:
                 text = text.strip()
@@ -445,14 +549,14 @@ class GeminiIntegration:
                     text = text[:-3]
                 text = text.strip()
 
-                plan = json.loads(text)
+                plan = orjson.loads(text)
                 self.current_task = plan['task']
                 self.task_steps = plan['steps']
                 self.current_step = 0
 
                 return self._execute_next_step(message, current_url, screenshot_path)
 
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.exception("Error parsing task plan JSON")
                 return {"action": "respond", "message": "I couldn't understand the task plan. Please try again."}
             except Exception as e:
@@ -519,46 +623,3 @@ class GeminiIntegration:
 
         else:
             return {"action": "respond", "message": step.get('details', 'Moving to next step...')}
-
-    def _add_to_chat(self, message):
-        """Add a message to the chat history."""
-        self.chat_history.append(message)
-
-    def _show_error(self, message):
-        """Show an error message in the chat."""
-        self._add_to_chat(f"Error: {message}")
-
-    def _take_screenshot(self):
-        """Take a screenshot of the browser view."""
-        try:
-            # Create screenshots directory if needed
-            os.makedirs("screenshots", exist_ok=True)
-
-            # Create a unique filename using timestamp and UUID
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = uuid.uuid4().hex[:8]
-            filename = os.path.join("screenshots", f"screenshot_{timestamp}_{unique_id}.png")
-
-            # Take screenshot
-            pixmap = self.browser.grab()
-            pixmap.save(filename)
-
-            # Display in chat interface
-            scaled_pixmap = pixmap.scaledToHeight(200, Qt.TransformationMode.SmoothTransformation)
-            self.screenshot_label.setPixmap(scaled_pixmap)
-
-            logger.info(f"Screenshot saved: {filename}")
-            return filename
-
-        except Exception as e:
-            logger.error(f"Error taking screenshot: {e}")
-            return None
-
-    def closeEvent(self, event):
-        """Handle application close."""
-        try:
-            logger.info("Closing application")
-            event.accept()
-        except Exception as e:
-            logger.exception("Error closing application")
-            event.accept()